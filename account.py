@@ -9,17 +9,27 @@ from typing import Union
 from eth_account.messages import encode_defunct
 from eth_account import Account as EthAccount
 from web3 import Web3
-from web3.contract.async_contract import AsyncContractConstructor
 from web3.exceptions import TransactionNotFound
+from hexbytes import HexBytes
 
 from well3 import Well3
+from gas_oracle import get_gas_oracle
+from receipts import get_receipt_tracker
+from nonces import get_nonce_manager
+from signer import get_signing_service
+from broadcast import get_tx_broadcaster
+from claims import get_claim_scheduler
+from events import decode_insight_logs
+from metrics import GAS_WAIT
+from tracing import traced
 from twitter import Twitter
 from models import AccountInfo
-from config import MIN_INSIGHTS_TO_OPEN, FAKE_TWITTER, MINT_DAILY_NFT_PERCENT, RPC_ETH, MAX_ETH_GWEI, ONLY_CHECK_AIRDROP
+from config import MIN_INSIGHTS_TO_OPEN, FAKE_TWITTER, MINT_DAILY_NFT_PERCENT, RPC, RPC_ETH, MAX_ETH_GWEI, \
+    ONLY_CHECK_AIRDROP, CLAIM_DAILY_INSIGHT, CLAIM_RANK_INSIGHTS, QUEST_RESULTS_INDEX, BROADCAST_TX, CLAIM_SCHEDULER
 from vars import SHARE_TWEET_FORMAT, WALLET_SIGN_MESSAGE_FORMAT, BREATHE_SESSION_CONDITION, \
-    INSIGHTS_CONTRACT_ADDRESS, INSIGHTS_CONTRACT_ABI, SCAN, SCAN_ETH, LOG_DATA_NAME_AND_COLOR, LOG_RESULT_TOPIC, \
-    MINT_TAGS, MINT_CONTRACT_ADDRESS, CLAIM_HUMAN_PROOF_ADDRESS, CLAIM_HUMAN_PROOF_ABI
-from utils import wait_a_bit, get_w3, to_bytes, async_retry, close_w3, log_long_exc
+    SCAN, SCAN_ETH, LOG_DATA_NAME_AND_COLOR, MINT_TAGS
+from contracts import INSIGHTS, CLAIM_HUMAN_PROOF, MINT, ContractCall
+from utils import wait_a_bit, get_w3, to_bytes, async_retry, close_w3, log_long_exc, contract_calls_batch
 
 
 colorama.init()
@@ -47,7 +57,6 @@ class Account:
 
         self.w3 = get_w3(self.account.proxy)
         self.w3_eth = get_w3(self.account.proxy, rpc=RPC_ETH)
-        self.insights_contract = self.w3.eth.contract(INSIGHTS_CONTRACT_ADDRESS, abi=INSIGHTS_CONTRACT_ABI)
         self.private_key = None
 
     async def close(self):
@@ -59,6 +68,7 @@ class Account:
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         await self.close()
 
+    @traced()
     async def refresh_profile(self):
         # await self.well3.generate_codes()
         self.profile = await self.well3.me()
@@ -70,6 +80,11 @@ class Account:
         self.account.exp = self.quests['exp']
         self.account.lvl = self.quests['rank']
         self.account.pending_quests = len(self.pending_quests)
+        contract_info = self.profile['contractInfo']
+        if 'rankupQuest' in contract_info:
+            self.account.contract_rank = contract_info['rankupQuest']['currentRank']
+        if 'dailyQuest' in contract_info:
+            self.account.daily_quest_nonce = contract_info['dailyQuest']['nonce']
         for _, task_info in self.quests['dailyProgress'].items():
             if task_info.get('condition') == BREATHE_SESSION_CONDITION:
                 self.set_time_until_next_breathe(task_info)
@@ -215,6 +230,7 @@ class Account:
                 raise
         raise last_exc
 
+    @traced()
     async def link_wallet_if_needed(self, private_key):
         if self.profile['contractInfo'].get('linkedAddress') is None:
             timestamp = int(time.time() * 1000)
@@ -240,32 +256,15 @@ class Account:
         tags = random.sample(MINT_TAGS, random.randint(1, 4))
         prompt = ','.join([self.account.mint_prompt] + tags)
 
-        length = hex(len(prompt))[2:].zfill(64)
-        prompt = prompt.encode('utf-8').hex()
-        if len(prompt) % 64 != 0:
-            prompt = prompt.ljust(64 - len(prompt) % 64, '0')
-
-        data = f'0x1f54b30a' \
-               f'0000000000000000000000000000000000000000000000000000000000000020' \
-               f'{length}{prompt}'
-
-        tx = {
-            'chainId': await self.w3.eth.chain_id,
-            'from': self.account.address,
-            'nonce': await self.w3.eth.get_transaction_count(self.account.address),
-            'to': MINT_CONTRACT_ADDRESS,
-            'data': to_bytes(data),
-            'maxPriorityFeePerGas': 10000,
-            'maxFeePerGas': 10024,
-        }
-        try:
-            _ = await self.w3.eth.estimate_gas(tx)
-        except Exception as e:
-            raise Exception(f'Mint tx simulation failed: {str(e)}')
-        tx['gas'] = 3000000
-
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        async with get_nonce_manager().reserve(self.w3, self.account.address) as nonce:
+            tx = await self.build_tx(self.w3, MINT.mint(prompt), nonce, 10000, 10024)
+            try:
+                _ = await self.w3.eth.estimate_gas(tx)
+            except Exception as e:
+                raise Exception(f'Mint tx simulation failed: {str(e)}')
+            tx['gas'] = 3000000
+            raw_tx = await get_signing_service().sign(tx, self.private_key)
+            tx_hash = await self.send_tx(self.w3, raw_tx)
 
         await self.tx_verification(tx_hash, f'Mint daily Well3NFT')
         await wait_a_bit(2)
@@ -288,89 +287,93 @@ class Account:
         return True
 
     @async_retry
-    async def build_and_send_tx(self, func: AsyncContractConstructor):
+    async def build_and_send_tx(self, contract_call: ContractCall):
         if self.private_key is None:
             raise Exception('No private key specified')
-        tx = await func.build_transaction({
-            'from': self.account.address,
-            'nonce': await self.w3.eth.get_transaction_count(self.account.address),
-            'maxPriorityFeePerGas': 10000,
-            'maxFeePerGas': 10024,
-        })
-        try:
-            _ = await self.w3.eth.estimate_gas(tx)
-        except Exception as e:
-            if self.profile["contractInfo"].get("linkedAddress") == self.account.address:
-                logger.info(f'{self.idx}) Tx simulation failed, refreshing signatures and retrying')
-                await self.refresh_profile()
-            raise Exception(f'Tx simulation failed: {str(e)}')
-        tx['gas'] = 300000
-
-        signed_tx = self.w3.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        async with get_nonce_manager().reserve(self.w3, self.account.address) as nonce:
+            try:
+                tx = await self.build_tx(self.w3, contract_call, nonce, 10000, 10024)
+                _ = await self.w3.eth.estimate_gas(tx)
+            except Exception as e:
+                if self.profile["contractInfo"].get("linkedAddress") == self.account.address:
+                    logger.info(f'{self.idx}) Tx simulation failed, refreshing signatures and retrying')
+                    await self.refresh_profile()
+                raise Exception(f'Tx simulation failed: {str(e)}')
+            tx['gas'] = 300000
+            raw_tx = await get_signing_service().sign(tx, self.private_key)
+            return await self.send_tx(self.w3, raw_tx)
 
-        return tx_hash
+    async def build_tx(self, w3, contract_call: ContractCall, nonce, max_priority_fee, max_fee_per_gas) -> dict:
+        return {
+            'chainId': await w3.eth.chain_id,
+            'from': self.account.address,
+            'nonce': nonce,
+            'to': contract_call.address,
+            'data': contract_call.data,
+            'maxPriorityFeePerGas': max_priority_fee,
+            'maxFeePerGas': max_fee_per_gas,
+        }
 
-    async def tx_verification(self, tx_hash, action, poll_latency=1):
+    async def send_tx(self, w3, raw_tx):
+        # Called inside the nonce reservation, so a reconcile meanwhile does not hand the nonce out again
+        try:
+            if BROADCAST_TX:
+                return await get_tx_broadcaster().broadcast(w3, raw_tx)
+            return await w3.eth.send_raw_transaction(raw_tx)
+        except BaseException:
+            # A failed or cancelled send may still have reached the node, the next tx reads the pending count
+            get_nonce_manager().reset(w3, self.account.address)
+            raise
+
+    async def tx_verification(self, tx_hash, action):
         logger.info(f'{self.idx}) {action} - Tx sent')
-        time_passed = 0
         tx_link = f'{SCAN}/tx/{tx_hash.hex()}'
-        while time_passed < 150:
-            try:
-                tx_data = await self.w3.eth.get_transaction_receipt(tx_hash)
-                if tx_data is not None:
-                    if tx_data.get('status') == 1:
-                        logger.success(f'{self.idx}) {action} - Successful tx: {tx_link}')
-                    else:
-                        logger.error(f'{self.idx}) {action} - Failed tx: {tx_link}')
-                    try:
-                        if logs := tx_data.get('logs'):
-                            for log in logs:
-                                topics = log.get('topics')
-                                if topics is None:
-                                    continue
-                                if topics[0].hex() != LOG_RESULT_TOPIC:
-                                    continue
-                                data = log.get('data')
-                                if data is None:
-                                    continue
-                                data = data.hex()[2:]
-                                values = [int(data[i:i+64], 16) for i in range(0, 64 * 6, 64)]
-                                pretty_str = []
-                                for idx, val in enumerate(values[2:]):
-                                    if val == 0:
-                                        continue
-                                    name, color = LOG_DATA_NAME_AND_COLOR[idx]
-                                    pretty_str.append(colored(f'{val} {name}', color, attrs=['bold']))
-                                pretty_str = ', '.join(pretty_str)
-                                print()
-                                logger.info(f'{self.idx}) Received: {pretty_str}')
-                                print()
-                    except:
-                        pass
-                    return
-            except TransactionNotFound:
-                pass
-
-            time_passed += poll_latency
-            await asyncio.sleep(poll_latency)
-
-        logger.warning(f'{self.idx}) {action} - Pending tx: {tx_link}')
+        tx_data = await get_receipt_tracker(RPC).wait(tx_hash, timeout=150)
+        if tx_data is None:
+            logger.warning(f'{self.idx}) {action} - Pending tx: {tx_link}')
+            await get_nonce_manager().reconcile(self.w3, self.account.address)
+            return
+        if tx_data.get('status') == 1:
+            logger.success(f'{self.idx}) {action} - Successful tx: {tx_link}')
+        else:
+            logger.error(f'{self.idx}) {action} - Failed tx: {tx_link}')
+        try:
+            for _, values in decode_insight_logs(tx_data.get('logs') or []):
+                pretty_str = []
+                for val, (name, color) in zip(values, LOG_DATA_NAME_AND_COLOR):
+                    if val == 0:
+                        continue
+                    pretty_str.append(colored(f'{val} {name}', color, attrs=['bold']))
+                pretty_str = ', '.join(pretty_str)
+                print()
+                logger.info(f'{self.idx}) Received: {pretty_str}')
+                print()
+        except:
+            pass
 
     @async_retry
     async def check_daily_insight(self):
         daily_quest = self.profile['contractInfo']['dailyQuest']
         nonce = daily_quest['nonce']
-        used = await self.insights_contract.functions.nonceUsed(nonce).call()
+        used = await INSIGHTS.nonceUsed(nonce).call(self.w3)
+        return self.set_daily_insight(used)
+
+    def set_daily_insight(self, used: bool):
         self.account.daily_insight = 'claimed' if used else 'available'
         if self.profile['dailyBonusInfo']['status']['superQuestEligible']:
             self.account.daily_insight = 'SUPER ' + self.account.daily_insight
         return self.account.daily_insight_colored
 
     async def claim_daily_insight(self):
+        if sent := await self.send_daily_insight_claim():
+            await self.tx_verification(*sent)
+            await wait_a_bit(2)
+            await self.refresh_profile()
+
+    async def send_daily_insight_claim(self):
         logger.info(f'{self.idx}) Daily insight status: {await self.check_daily_insight()}')
         if not self.account.daily_insight.endswith('available'):
-            return
+            return None
 
         is_super_log = ''
         if self.profile['dailyBonusInfo']['status']['superQuestEligible']:
@@ -381,43 +384,62 @@ class Account:
             signatures = [to_bytes(sig) for sig in super_daily_quest['signatures']]
             tags = super_daily_quest['tags']
             tx_hash = await self.build_and_send_tx(
-                self.insights_contract.functions.nonceQuests(nonces, tags, prob_set_number, signatures)
+                INSIGHTS.nonceQuests(nonces, tags, prob_set_number, signatures)
             )
         else:
             daily_quest = self.profile['contractInfo']['dailyQuest']
             nonce = daily_quest['nonce']
             signature = to_bytes(daily_quest['signature'])
-            tx_hash = await self.build_and_send_tx(self.insights_contract.functions.nonceQuest(nonce, signature))
+            tx_hash = await self.build_and_send_tx(INSIGHTS.nonceQuest(nonce, signature))
 
-        await self.tx_verification(tx_hash, f'Claim {is_super_log}daily insight')
-        await wait_a_bit(2)
-        await self.refresh_profile()
+        return tx_hash, f'Claim {is_super_log}daily insight'
 
     @async_retry
     async def check_rank_insights(self):
         rank_quest = self.profile['contractInfo']['rankupQuest']
         current_rank = rank_quest['currentRank']
-        cnt = await self.insights_contract.functions.getQuests(current_rank, self.account.address).call()
+        cnt = await INSIGHTS.getQuests(current_rank, self.account.address).call(self.w3)
         self.account.insights_to_open = cnt
         return self.account.insights_to_open
 
     async def claim_rank_insights(self):
+        if sent := await self.send_rank_insights_claim():
+            await self.tx_verification(*sent)
+            await wait_a_bit(2)
+            await self.refresh_profile()
+
+    async def send_rank_insights_claim(self):
         logger.info(f'{self.idx}) Rank insights available to open: {await self.check_rank_insights()}')
         if self.account.insights_to_open < MIN_INSIGHTS_TO_OPEN:
-            return
+            return None
         rank_quest = self.profile['contractInfo']['rankupQuest']
         current_rank = rank_quest['currentRank']
         signature = to_bytes(rank_quest['signature'])
-        tx_hash = await self.build_and_send_tx(self.insights_contract.functions.
-                                               rankupQuestAmount(current_rank, signature,
-                                                                 self.account.insights_to_open))
-        await self.tx_verification(tx_hash, 'Claim rank insight')
+        tx_hash = await self.build_and_send_tx(INSIGHTS.rankupQuestAmount(current_rank, signature,
+                                                                          self.account.insights_to_open))
+        return tx_hash, 'Claim rank insight'
+
+    @traced()
+    async def claim_insights(self, daily: bool = CLAIM_DAILY_INSIGHT, rank: bool = CLAIM_RANK_INSIGHTS):
+        # Both claims are sent back-to-back on locally allocated nonces, their receipts come from one tracker poll
+        sent = []
+        if daily:
+            sent.append(await self.send_daily_insight_claim())
+        if rank:
+            sent.append(await self.send_rank_insights_claim())
+        sent = [s for s in sent if s is not None]
+        if len(sent) == 0:
+            return
+        await asyncio.gather(*[self.tx_verification(tx_hash, action) for tx_hash, action in sent])
         await wait_a_bit(2)
         await self.refresh_profile()
 
     @async_retry
     async def check_results(self):
-        result = await self.insights_contract.functions.questResults(self.account.address).call()
+        result = await INSIGHTS.questResults(self.account.address).call(self.w3)
+        self.set_results(result)
+
+    def set_results(self, result):
         self.account.insights = {
             'uncommon': result[0],
             'rare': result[1],
@@ -425,51 +447,54 @@ class Account:
             'mythical': result[3],
         }
 
+    @async_retry
     async def check_insights(self):
-        await self.check_daily_insight()
-        await self.check_rank_insights()
-        await self.check_results()
+        nonce = self.profile['contractInfo']['dailyQuest']['nonce']
+        current_rank = self.profile['contractInfo']['rankupQuest']['currentRank']
+        calls = [
+            INSIGHTS.nonceUsed(nonce),
+            INSIGHTS.getQuests(current_rank, self.account.address),
+        ]
+        if not QUEST_RESULTS_INDEX:
+            calls.append(INSIGHTS.questResults(self.account.address))
+        used, cnt, *result = await contract_calls_batch(self.w3, calls)
+        self.set_daily_insight(used)
+        self.account.insights_to_open = cnt
+        if len(result) > 0:
+            self.set_results(result[0])
 
+    @traced('gas_wait', 'wait')
     async def wait_for_eth_gas_price(self):
-        t = 0
-        while (await self.w3_eth.eth.gas_price) > Web3.to_wei(MAX_ETH_GWEI, 'gwei'):
-            gas_price = (await self.w3_eth.eth.gas_price) / 10 ** 9
-            gas_price = round(gas_price, 2)
-            logger.info(f'{self.idx}) Gas price is too high - {gas_price}. Waiting for 10s')
-            t += 10
-            if t >= 360000:
-                break
-            await asyncio.sleep(10)
-
-        if (await self.w3_eth.eth.gas_price) > Web3.to_wei(MAX_ETH_GWEI, 'gwei'):
+        oracle = get_gas_oracle()
+        max_gas_price = Web3.to_wei(MAX_ETH_GWEI, 'gwei')
+        if oracle.gas_price is None or oracle.gas_price > max_gas_price:
+            logger.info(f'{self.idx}) Waiting for gas price under {MAX_ETH_GWEI} gwei')
+        start = time.perf_counter()
+        try:
+            await oracle.wait_for_gas_below(max_gas_price, timeout=360000)
+        except asyncio.TimeoutError:
             raise Exception('Gas price is too high')
+        finally:
+            GAS_WAIT.observe(time.perf_counter() - start)
 
-    async def eth_tx_verification(self, tx_hash, action, poll_latency=1):
+    async def eth_tx_verification(self, tx_hash, action):
         logger.info(f'{self.idx}) {action} - Tx sent')
-        time_passed = 0
         tx_link = f'{SCAN_ETH}/tx/{tx_hash.hex()}'
-        while time_passed < 150:
-            try:
-                tx_data = await self.w3_eth.eth.get_transaction_receipt(tx_hash)
-                if tx_data is not None:
-                    if tx_data.get('status') == 1:
-                        logger.success(f'{self.idx}) {action} - Successful tx: {tx_link}')
-                    else:
-                        logger.error(f'{self.idx}) {action} - Failed tx: {tx_link}')
-                    return
-            except TransactionNotFound:
-                pass
-
-            time_passed += poll_latency
-            await asyncio.sleep(poll_latency)
-
-        logger.warning(f'{self.idx}) {action} - Pending tx: {tx_link}')
+        tx_data = await get_receipt_tracker(RPC_ETH).wait(tx_hash, timeout=150)
+        if tx_data is None:
+            logger.warning(f'{self.idx}) {action} - Pending tx: {tx_link}')
+            await get_nonce_manager().reconcile(self.w3_eth, self.account.address)
+        elif tx_data.get('status') == 1:
+            logger.success(f'{self.idx}) {action} - Successful tx: {tx_link}')
+        else:
+            logger.error(f'{self.idx}) {action} - Failed tx: {tx_link}')
+        return tx_data
 
+    @traced()
     async def claim_human_proof(self):
         logger.info(f'{self.idx}) Starting claim 4.2 WELL for human proof')
 
-        contract = self.w3_eth.eth.contract(CLAIM_HUMAN_PROOF_ADDRESS, abi=CLAIM_HUMAN_PROOF_ABI)
-        if await contract.functions.claimedMap(self.account.address).call():
+        if await CLAIM_HUMAN_PROOF.claimedMap(self.account.address).call(self.w3_eth):
             logger.info(f'{self.idx}) Already claimed')
             self.account.claimed_human_proof = True
         else:
@@ -478,24 +503,18 @@ class Account:
 
             await self.wait_for_eth_gas_price()
 
-            max_priority_fee = await self.w3_eth.eth.max_priority_fee
-            max_fee_per_gas = int((await self.w3_eth.eth.get_block("latest"))["baseFeePerGas"] *
-                                  random.uniform(1.1, 1.3))
-            max_fee_per_gas += max_priority_fee
-
-            tx = await contract.functions.claim(to_bytes(sig), user_id).build_transaction({
-                'from': self.account.address,
-                'nonce': await self.w3_eth.eth.get_transaction_count(self.account.address),
-                'maxPriorityFeePerGas': max_priority_fee,
-                'maxFeePerGas': max_fee_per_gas,
-            })
-            try:
-                estimate = await self.w3_eth.eth.estimate_gas(tx)
-            except Exception as e:
-                raise Exception(f'Tx simulation failed: {str(e)}')
-            tx['gas'] = int(estimate * random.uniform(1.1, 1.3))
-            signed_tx = self.w3_eth.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = await self.w3_eth.eth.send_raw_transaction(signed_tx.rawTransaction)
+            max_priority_fee, max_fee_per_gas = await get_gas_oracle().estimate_fees()
+
+            async with get_nonce_manager().reserve(self.w3_eth, self.account.address) as nonce:
+                try:
+                    tx = await self.build_tx(self.w3_eth, CLAIM_HUMAN_PROOF.claim(to_bytes(sig), user_id),
+                                             nonce, max_priority_fee, max_fee_per_gas)
+                    estimate = await self.w3_eth.eth.estimate_gas(tx)
+                except Exception as e:
+                    raise Exception(f'Tx simulation failed: {str(e)}')
+                tx['gas'] = int(estimate * random.uniform(1.1, 1.3))
+                raw_tx = await get_signing_service().sign(tx, self.private_key)
+                tx_hash = await self.send_tx(self.w3_eth, raw_tx)
 
             await self.eth_tx_verification(tx_hash, 'Claim Human Proof')
 
@@ -512,45 +531,71 @@ class Account:
 
         await self.well3.submit_bybit()
 
-    async def claim_airdrop(self):
+    @traced()
+    async def claim_airdrop(self, only_check: bool = ONLY_CHECK_AIRDROP):
         details = await self.well3.get_airdrop_details()
         if type(details) is dict and details.get('error') == 'Not Found':
             self.account.airdrop = 0
             return
         self.account.airdrop = int(details[1])
-        if ONLY_CHECK_AIRDROP:
+        self.account.airdrop_sig = details[0]
+        if only_check:
             return
         sig = details[0]
 
-        contract = self.w3_eth.eth.contract(CLAIM_HUMAN_PROOF_ADDRESS, abi=CLAIM_HUMAN_PROOF_ABI)
-        if await contract.functions.isSignatureClaimed(to_bytes(sig)).call():
+        if await CLAIM_HUMAN_PROOF.isSignatureClaimed(to_bytes(sig)).call(self.w3_eth):
             logger.info(f'{self.idx}) Airdrop already claimed')
+            self.account.airdrop_claimed = True
+            self.account.airdrop_claim_tx = ''
+            return
+
+        if self.account.airdrop_claim_tx != '' and await self.check_sent_airdrop_claim():
             self.account.airdrop_claimed = True
             return
 
         logger.info(f'{self.idx}) Ready to claim {int(self.account.airdrop / 10 ** 18)} $WELL')
 
-        await self.wait_for_eth_gas_price()
+        if CLAIM_SCHEDULER:
+            async with get_claim_scheduler().claim_slot(self.account.airdrop):
+                tx_hash = await self.send_airdrop_claim(sig)
+        else:
+            await self.wait_for_eth_gas_price()
+            tx_hash = await self.send_airdrop_claim(sig)
 
-        max_priority_fee = await self.w3_eth.eth.max_priority_fee
-        max_fee_per_gas = int((await self.w3_eth.eth.get_block("latest"))["baseFeePerGas"] *
-                              random.uniform(1.1, 1.3))
-        max_fee_per_gas += max_priority_fee
+        if await self.eth_tx_verification(tx_hash, 'Claim Airdrop') is not None:
+            self.account.airdrop_claim_tx = ''
 
-        tx = await contract.functions.claimV2(to_bytes(sig), self.account.airdrop).build_transaction({
-            'from': self.account.address,
-            'nonce': await self.w3_eth.eth.get_transaction_count(self.account.address),
-            'maxPriorityFeePerGas': max_priority_fee,
-            'maxFeePerGas': max_fee_per_gas,
-        })
+        self.account.airdrop_claimed = True
+
+    async def check_sent_airdrop_claim(self) -> bool:
+        # A claim sent before a deadline or a crash may still be pending, a second one would revert and burn gas
+        tx_hash = self.account.airdrop_claim_tx
         try:
-            estimate = await self.w3_eth.eth.estimate_gas(tx)
-        except Exception as e:
-            raise Exception(f'Tx simulation failed: {str(e)}')
-        tx['gas'] = int(estimate * random.uniform(1.1, 1.3))
-        signed_tx = self.w3_eth.eth.account.sign_transaction(tx, self.private_key)
-        tx_hash = await self.w3_eth.eth.send_raw_transaction(signed_tx.rawTransaction)
+            await self.w3_eth.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            logger.info(f'{self.idx}) Previous airdrop claim tx {tx_hash} was dropped')
+            self.account.airdrop_claim_tx = ''
+            await get_nonce_manager().reconcile(self.w3_eth, self.account.address)
+            return False
+        tx_data = await self.eth_tx_verification(HexBytes(tx_hash), 'Previous Claim Airdrop')
+        if tx_data is None:
+            raise Exception(f'Previous airdrop claim tx is still pending: {SCAN_ETH}/tx/{tx_hash}')
+        self.account.airdrop_claim_tx = ''
+        return tx_data.get('status') == 1
 
-        await self.eth_tx_verification(tx_hash, 'Claim Airdrop')
+    async def send_airdrop_claim(self, sig: str):
+        max_priority_fee, max_fee_per_gas = await get_gas_oracle().estimate_fees()
 
-        self.account.airdrop_claimed = True
+        async with get_nonce_manager().reserve(self.w3_eth, self.account.address) as nonce:
+            try:
+                tx = await self.build_tx(self.w3_eth, CLAIM_HUMAN_PROOF.claimV2(to_bytes(sig), self.account.airdrop),
+                                         nonce, max_priority_fee, max_fee_per_gas)
+                estimate = await self.w3_eth.eth.estimate_gas(tx)
+            except Exception as e:
+                raise Exception(f'Tx simulation failed: {str(e)}')
+            tx['gas'] = int(estimate * random.uniform(1.1, 1.3))
+            raw_tx = await get_signing_service().sign(tx, self.private_key)
+
+            # Recorded before sending, the send itself can be cut off by the stage deadline after the node got the tx
+            self.account.airdrop_claim_tx = Web3.to_hex(Web3.keccak(raw_tx))
+            return await self.send_tx(self.w3_eth, raw_tx)
@@ -1,14 +1,16 @@
+import asyncio
 import logging
 import os
 import threading
-from typing import Any, Dict, Iterable, Optional, Tuple, Union
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 
 from aiohttp import ClientSession, ClientResponse, ClientTimeout
-from aiohttp_socks import ProxyConnector
 from eth_typing import URI
 from eth_utils import to_dict
 
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
 from web3.types import AsyncMiddleware, RPCEndpoint, RPCResponse
 from web3.datastructures import NamedElementOnion
 from web3.middleware.exception_retry_request import async_http_retry_request_middleware
@@ -16,10 +18,11 @@ from web3.providers.async_base import AsyncJSONBaseProvider
 from web3.utils.caching import SimpleCache
 from web3._utils.async_caching import async_lock
 from web3._utils.caching import generate_cache_key
-from web3._utils.request import _async_close_evicted_sessions
 
 from vars import USER_AGENT
-from config import DISABLE_SSL
+from transport import create_session
+from tracing import span
+from config import DISABLE_SSL, RPC_BATCH_WINDOW, RPC_BATCH_MAX_SIZE, RPC_CACHE, RPC_BLOCK_TIMES
 
 
 logger = logging.getLogger(__name__)
@@ -37,11 +40,88 @@ def construct_user_agent(class_name: str) -> str:
 _async_session_cache = SimpleCache()
 _async_session_cache_lock = threading.Lock()
 _async_session_pool = ThreadPoolExecutor(max_workers=1)
+_async_evicted_sessions = set()
+_async_close_tasks = set()
+
+
+async def _async_close_sessions(sessions: List[ClientSession]):
+    for sess in sessions:
+        await sess.close()
+        _async_evicted_sessions.discard(sess)
+
+
+def _schedule_close_sessions(sessions: List[ClientSession]):
+    task = asyncio.get_running_loop().create_task(_async_close_sessions(sessions))
+    _async_close_tasks.add(task)
+    task.add_done_callback(_async_close_tasks.discard)
 
 
 async def close_all_sessions():
+    # Everything here is bound to the current loop, so nothing is kept for the next LOOP_RUNS cycle
     for _, sess in _async_session_cache.items():
         await sess.close()
+    _async_session_cache.clear()
+    await _async_close_sessions(list(_async_evicted_sessions))
+    _async_batchers.clear()
+
+
+class AsyncRPCBatcher:
+
+    def __init__(self, provider: "AsyncHTTPProviderWithProxy", window: float, max_size: int):
+        self.provider = provider
+        self.window = window
+        self.max_size = max_size
+        self.loop = asyncio.get_running_loop()
+        self.pending: List[Tuple[RPCEndpoint, Any, asyncio.Future]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.tasks = set()
+
+    async def submit(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        future = self.loop.create_future()
+        self.pending.append((method, params, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = self.loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, []
+        if len(pending) == 0:
+            return
+        task = self.loop.create_task(self._send(pending))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, pending: List[Tuple[RPCEndpoint, Any, asyncio.Future]]):
+        try:
+            if len(pending) == 1:
+                responses = [await self.provider.make_single_request(pending[0][0], pending[0][1])]
+            else:
+                responses = await self.provider.make_batch_request([(m, p) for m, p, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), response in zip(pending, responses):
+            if not future.done():
+                future.set_result(response)
+
+
+_async_batchers: Dict[str, AsyncRPCBatcher] = {}
+
+
+def get_batcher(provider: "AsyncHTTPProviderWithProxy") -> AsyncRPCBatcher:
+    key = f"{threading.get_ident()}:{provider.endpoint_uri}:{provider.proxy if provider.proxy else ''}"
+    batcher = _async_batchers.get(key)
+    if batcher is None or batcher.loop is not asyncio.get_running_loop():
+        batcher = AsyncRPCBatcher(provider, provider.batch_window, provider.batch_max_size)
+        _async_batchers[key] = batcher
+    return batcher
 
 
 async def async_cache_and_return_session_with_proxy(
@@ -56,8 +136,7 @@ async def async_cache_and_return_session_with_proxy(
     async with async_lock(_async_session_pool, _async_session_cache_lock):
         if cache_key not in _async_session_cache:
             if session is None:
-                conn = ProxyConnector.from_url(proxy) if proxy else None
-                session = ClientSession(connector=conn, raise_for_status=True)
+                session = create_session(proxy, raise_for_status=True)
 
             cached_session, evicted_items = _async_session_cache.cache(
                 cache_key, session
@@ -92,8 +171,7 @@ async def async_cache_and_return_session_with_proxy(
                 )
 
                 # replace stale session with a new session at the cache key
-                _conn = ProxyConnector.from_url(proxy) if proxy else None
-                _session = ClientSession(connector=_conn, raise_for_status=True)
+                _session = create_session(proxy, raise_for_status=True)
                 cached_session, evicted_items = _async_session_cache.cache(
                     cache_key, _session
                 )
@@ -109,17 +187,17 @@ async def async_cache_and_return_session_with_proxy(
                 "Async session cache full. Session evicted from cache: "
                 f"{evicted_session}",
             )
-        # Kick off a future task, in a separate thread, to close the evicted
-        # sessions. In the case that the cache filled very quickly and some
-        # sessions have been evicted before their original request has been made,
-        # we set the timer to a bit more than the `DEFAULT_TIMEOUT` for a call. This
-        # should make it so that any call from an evicted session can still be made
-        # before the session is closed.
-        threading.Timer(
-            DEFAULT_TIMEOUT + 0.1,
-            _async_close_evicted_sessions,
-            args=[evicted_sessions],
-        ).start()
+        # Close the evicted sessions on their own loop a bit later than the
+        # `DEFAULT_TIMEOUT` for a call. In the case that the cache filled very quickly
+        # and some sessions have been evicted before their original request has been
+        # made, this should make it so that the call can still be made before the
+        # session is closed. Sessions still open when the loop finishes are closed
+        # by `close_all_sessions`.
+        evicted_sessions = list(evicted_sessions)
+        _async_evicted_sessions.update(evicted_sessions)
+        asyncio.get_running_loop().call_later(
+            DEFAULT_TIMEOUT + 0.1, _schedule_close_sessions, evicted_sessions
+        )
 
     return cached_session
 
@@ -143,18 +221,96 @@ async def async_make_post_request_with_proxy(
     return await response.read()
 
 
+DEFAULT_BLOCK_TIME = 2
+FEE_METHODS = ('eth_gasPrice', 'eth_maxPriorityFeePerGas', 'eth_feeHistory')
+SEND_METHODS = ('eth_sendRawTransaction', 'eth_sendTransaction')
+
+_rpc_response_cache: Dict[str, Tuple[float, RPCResponse]] = {}
+_rpc_inflight: Dict[str, asyncio.Future] = {}
+
+
+def get_cache_ttl(method: RPCEndpoint, params: Any, block_time: float) -> Optional[float]:
+    if method == 'eth_chainId':
+        return float('inf')
+    if method in FEE_METHODS:
+        return block_time
+    if method == 'eth_getBlockByNumber' and params and params[0] == 'latest':
+        return block_time
+    return None
+
+
+def clear_rpc_cache():
+    _rpc_response_cache.clear()
+    _rpc_inflight.clear()
+
+
+async def async_rpc_cache_middleware(
+    make_request: Callable[[RPCEndpoint, Any], Any], async_w3: Any
+) -> Callable[[RPCEndpoint, Any], Any]:
+    endpoint_uri = getattr(async_w3.provider, 'endpoint_uri', '')
+    block_time = RPC_BLOCK_TIMES.get(endpoint_uri, DEFAULT_BLOCK_TIME)
+
+    async def middleware(method: RPCEndpoint, params: Any) -> RPCResponse:
+        if not RPC_CACHE or method in SEND_METHODS:
+            return await make_request(method, params)
+
+        encoded_params = FriendlyJsonSerde().json_encode(params, cls=Web3JsonEncoder)
+        key = generate_cache_key(f"{endpoint_uri}:{method}:{encoded_params}")
+        ttl = get_cache_ttl(method, params, block_time)
+        if ttl is not None:
+            cached = _rpc_response_cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                return dict(cached[1])
+
+        future = _rpc_inflight.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            try:
+                return dict(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if not future.cancelled() or (hasattr(task, 'cancelling') and task.cancelling() > 0):
+                    raise
+            # The owner was cancelled, e.g. by its stage deadline: join the next request or send our own
+            return await middleware(method, params)
+
+        future = asyncio.get_running_loop().create_future()
+        _rpc_inflight[key] = future
+        try:
+            response = await make_request(method, params)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # retrieve the exception so that it is not reported when nobody else awaited
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            if ttl is not None and 'error' not in response:
+                _rpc_response_cache[key] = (time.monotonic() + ttl, response)
+            return dict(response)
+        finally:
+            if _rpc_inflight.get(key) is future:
+                _rpc_inflight.pop(key)
+
+    return middleware
+
+
 class AsyncHTTPProviderWithProxy(AsyncJSONBaseProvider):
     logger = logging.getLogger("web3.providers.AsyncHTTPProvider")
     endpoint_uri = None
     _request_kwargs = None
     # type ignored b/c conflict with _middlewares attr on AsyncBaseProvider
-    _middlewares: Tuple[AsyncMiddleware, ...] = NamedElementOnion([(async_http_retry_request_middleware, "http_retry_request")])  # type: ignore # noqa: E501
+    _middlewares: Tuple[AsyncMiddleware, ...] = NamedElementOnion([(async_rpc_cache_middleware, "rpc_cache"), (async_http_retry_request_middleware, "http_retry_request")])  # type: ignore # noqa: E501
 
     def __init__(
         self,
         endpoint_uri: Optional[Union[URI, str]] = None,
         proxy: Optional[str] = None,
         request_kwargs: Optional[Any] = None,
+        batch_window: Optional[float] = RPC_BATCH_WINDOW,
+        batch_max_size: int = RPC_BATCH_MAX_SIZE,
     ) -> None:
         if endpoint_uri is None:
             self.endpoint_uri = get_default_http_endpoint()
@@ -162,6 +318,8 @@ class AsyncHTTPProviderWithProxy(AsyncJSONBaseProvider):
             self.endpoint_uri = URI(endpoint_uri)
 
         self.proxy = proxy
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
 
         self._request_kwargs = request_kwargs or {}
         if DISABLE_SSL:
@@ -192,7 +350,46 @@ class AsyncHTTPProviderWithProxy(AsyncJSONBaseProvider):
             "User-Agent": construct_user_agent(str(type(self))),
         }
 
+    def encode_rpc_batch_request(self, requests: List[Tuple[RPCEndpoint, Any]]) -> Tuple[List[int], bytes]:
+        ids, rpc_dicts = [], []
+        for method, params in requests:
+            request_id = next(self.request_counter)
+            ids.append(request_id)
+            rpc_dicts.append({
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params or [],
+                "id": request_id,
+            })
+        encoded = FriendlyJsonSerde().json_encode(rpc_dicts, cls=Web3JsonEncoder)
+        return ids, encoded.encode('utf-8')
+
+    async def make_batch_request(self, requests: List[Tuple[RPCEndpoint, Any]]) -> List[RPCResponse]:
+        self.logger.debug(
+            f"Making batch request HTTP. URI: {self.endpoint_uri}, Size: {len(requests)}"
+        )
+        ids, request_data = self.encode_rpc_batch_request(requests)
+        with span('batch', 'rpc', size=len(requests)):
+            raw_response = await async_make_post_request_with_proxy(
+                self.endpoint_uri, self.proxy, request_data, **self.get_request_kwargs()
+            )
+        response = self.decode_rpc_response(raw_response)
+        if not isinstance(response, list):
+            raise Exception(f'Bad batch response: {response}')
+        by_id = {r.get('id'): r for r in response}
+        return [by_id.get(request_id, {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {"code": -32603, "message": "Missing response in batch"},
+        }) for request_id in ids]
+
     async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        with span(method, 'rpc'):
+            if self.batch_window:
+                return await get_batcher(self).submit(method, params)
+            return await self.make_single_request(method, params)
+
+    async def make_single_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
         self.logger.debug(
             f"Making request HTTP. URI: {self.endpoint_uri}, Method: {method}"
         )
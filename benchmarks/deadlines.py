@@ -0,0 +1,132 @@
+import sys
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from loguru import logger
+from eth_account import Account as EthAccount
+
+from account import Account
+from models import AccountInfo
+from async_web3 import close_all_sessions, clear_rpc_cache
+from gas_oracle import stop_gas_oracle
+from receipts import stop_receipt_trackers
+from nonces import get_nonce_manager
+from transport import set_replay_url
+from utils import run_with_deadline, DeadlineExceeded
+from benchmarks.simulator import UpstreamSimulator, parse_upstream_configs, AIRDROP_AMOUNT
+from benchmarks.virtual_clock import VirtualTimeEventLoop
+
+
+SIG = '0x' + '11' * 65
+
+
+async def claim(account: Account):
+    tx_hash = await account.send_airdrop_claim(SIG)
+    if await account.eth_tx_verification(tx_hash, 'Claim Airdrop') is not None:
+        account.account.airdrop_claim_tx = ''
+
+
+def check_nonce(simulator: UpstreamSimulator, account: Account) -> str:
+    # The local counter may be dropped, then the next tx reads the pending count. If kept it must match the node
+    key = get_nonce_manager()._key(account.w3_eth, account.account.address)
+    local = get_nonce_manager().nonces.get(key)
+    pending = simulator.pending_count(account.account.address)
+    if local is not None and local != pending:
+        return f'local nonce {local} != pending {pending}'
+    return ''
+
+
+async def run_trial(simulator: UpstreamSimulator, timeout: float, settle: float) -> tuple:
+    key = EthAccount.create().key.hex()
+    address = EthAccount.from_key(key).address
+    account = Account(timeout, AccountInfo(address=address, airdrop=int(AIRDROP_AMOUNT)), None, None)
+    account.private_key = key
+    try:
+        try:
+            await run_with_deadline('airdrop', claim(account), timeout)
+            return 'completed', ''
+        except DeadlineExceeded:
+            pass
+        # Lets a send that was cut off on our side land on the node before looking at the state
+        await asyncio.sleep(settle)
+        sent = account.account.airdrop_claim_tx != ''
+        phase = 'not sent' if not sent else ('on node' if account.account.airdrop_claim_tx in simulator.txs
+                                             else 'send cut off')
+        if error := check_nonce(simulator, account):
+            return phase, error
+
+        if sent:
+            if not await account.check_sent_airdrop_claim():
+                await claim(account)
+        else:
+            await claim(account)
+
+        if error := check_nonce(simulator, account):
+            return phase, error
+        sends = len([tx for tx in simulator.txs.values() if tx[1] == address.lower()])
+        if sends != 1:
+            return phase, f'{sends} claim txs sent'
+        if simulator.nonce_gaps(address) > 0:
+            return phase, 'nonce gap left'
+        if account.account.airdrop_claim_tx != '':
+            return phase, 'claim tx was not checked'
+        return phase, ''
+    finally:
+        await account.close()
+
+
+async def run_suite(args):
+    configs = parse_upstream_configs(args.latency, 0.0, 0.0, None)
+    simulator = UpstreamSimulator(configs, block_time=args.block_time, seed=args.seed)
+    set_replay_url(await simulator.start())
+    outcomes, errors = Counter(), []
+    try:
+        timeouts = [round(args.step * i, 4) for i in range(1, int(args.max_timeout / args.step) + 1)]
+        for timeout in timeouts:
+            phase, error = await run_trial(simulator, timeout, args.settle)
+            outcomes[phase] += 1
+            if error:
+                errors.append((timeout, phase, error))
+    finally:
+        await stop_gas_oracle()
+        await stop_receipt_trackers()
+        await close_all_sessions()
+        clear_rpc_cache()
+        set_replay_url(None)
+        await simulator.stop()
+
+    print(f'{"deadline fired":>16} {"trials":>7}', file=sys.stderr)
+    for phase in ('not sent', 'send cut off', 'on node', 'completed'):
+        print(f'{phase:>16} {outcomes[phase]:>7}', file=sys.stderr)
+    for timeout, phase, error in errors:
+        print(f'deadline {timeout}s {phase}: {error}', file=sys.stderr)
+    return len(errors) == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fire the airdrop stage deadline at every point of a claim and check '
+                                                 'that nonces and sent claims stay consistent for the retry')
+    parser.add_argument('--latency', type=float, default=0.05, help='mean upstream latency in seconds')
+    parser.add_argument('--step', type=float, default=0.01, help='deadline step in seconds')
+    parser.add_argument('--max-timeout', type=float, default=30.0)
+    parser.add_argument('--settle', type=float, default=1.0, help='wait for in-flight requests after a deadline')
+    parser.add_argument('--block-time', type=float, default=12.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR')
+    # Cancelled sends drop the connection mid-request, the simulator side logs it as an error
+    logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+    loop = VirtualTimeEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        ok = loop.run_until_complete(run_suite(args))
+    finally:
+        loop.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from loguru import logger
+from datetime import datetime
+
+from logsink import LogSink
+
+
+def make_error(i: int, distinct: int) -> Exception:
+    return Exception(f'Bad status code [502]: Response = upstream error {i % distinct}\n<html>\n{"x" * 200}\n</html>')
+
+
+async def log_direct(idx, e: Exception, errors_filename: str):
+    # Same thread pool round trips as aiofiles open/write/flush/close per entry
+    loop = asyncio.get_running_loop()
+    e_msg_lines = str(e).splitlines()
+    logger.error(f'{idx}) Process account error: {e_msg_lines[0]}')
+    file = await loop.run_in_executor(None, lambda: open(errors_filename, 'a', encoding='utf-8'))
+    await loop.run_in_executor(None, file.write, f'{str(datetime.now())} | {idx}) Process account error: {str(e)}')
+    await loop.run_in_executor(None, file.flush)
+    await loop.run_in_executor(None, file.close)
+
+
+async def log_queued(sink: LogSink, idx, e: Exception):
+    e_msg_lines = str(e).splitlines()
+    logger.error(f'{idx}) Process account error: {e_msg_lines[0]}')
+    sink.write_error(idx, 'Process account error', str(e))
+
+
+async def run(n: int, distinct: int, concurrency: int, queued: bool, sink: LogSink, errors_filename: str) -> float:
+    errors = [make_error(i, distinct) for i in range(n)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _log(i, e):
+        async with semaphore:
+            if queued:
+                await log_queued(sink, i, e)
+            else:
+                await log_direct(i, e, errors_filename)
+
+    st = time.perf_counter()
+    await asyncio.gather(*[_log(i, e) for i, e in enumerate(errors)])
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20000)
+    parser.add_argument('--distinct', type=int, default=10, help='number of distinct error messages')
+    parser.add_argument('--concurrency', type=int, default=100, help='accounts failing at once')
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, 'w')
+    print(f'{"mode":>8} {"loop msg/s":>12} {"total msg/s":>12} {"file lines":>12}', file=sys.stderr)
+    for queued in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            errors_filename = os.path.join(tmp, 'errors.txt')
+            sink = LogSink(stream=devnull, errors_filename=errors_filename, maxsize=args.n * 2)
+            sink.start()
+            logger.remove()
+            if queued:
+                logger.add(sink.write_console, format='{time} | {level} | {message}')
+            else:
+                logger.add(devnull, format='{time} | {level} | {message}')
+            st = time.perf_counter()
+            loop_elapsed = asyncio.run(run(args.n, args.distinct, args.concurrency, queued, sink, errors_filename))
+            sink.stop()
+            total_elapsed = time.perf_counter() - st
+            with open(errors_filename, 'r', encoding='utf-8') as file:
+                lines = sum(1 for _ in file)
+            print(f'{"queued" if queued else "direct":>8} {args.n / loop_elapsed:>12.0f} '
+                  f'{args.n / total_elapsed:>12.0f} {lines:>12}', file=sys.stderr)
+    devnull.close()
+
+
+if __name__ == '__main__':
+    main()
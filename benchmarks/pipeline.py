@@ -0,0 +1,115 @@
+import sys
+import time
+import asyncio
+import argparse
+from loguru import logger
+from eth_abi import encode
+from eth_account import Account as EthAccount
+
+from account import Account
+from well3 import Well3
+from models import AccountInfo
+from contracts import INSIGHTS
+from config import MIN_INSIGHTS_TO_OPEN
+from async_web3 import close_all_sessions, clear_rpc_cache
+from receipts import stop_receipt_trackers
+from transport import set_replay_url
+from benchmarks.simulator import UpstreamSimulator, parse_upstream_configs
+from benchmarks.throughput import percentile
+from benchmarks.virtual_clock import VirtualTimeEventLoop
+
+
+def make_account(idx: int) -> Account:
+    key = EthAccount.create().key.hex()
+    info = AccountInfo(
+        address=EthAccount.from_key(key).address, twitter_auth_token=f'twitter-{idx}',
+        well3_auth_token=f'sim-{idx}', well3_auth_token_expire_at=int(time.time()) + 3600 * 24,
+        well3_refresh_token=f'sim-refresh-{idx}',
+    )
+    account = Account(idx, info, Well3(idx, info, None), None)
+    account.private_key = key
+    return account
+
+
+async def claim_sequential(account: Account):
+    # Each claim waits for its receipt before the next one is built
+    await account.claim_daily_insight()
+    await account.claim_rank_insights()
+
+
+async def run(simulator: UpstreamSimulator, n: int, pipelined: bool) -> dict:
+    loop = asyncio.get_running_loop()
+    latencies, send_gaps = [], []
+
+    async def process(idx: int):
+        account = make_account(idx)
+        try:
+            await account.refresh_profile()
+            st = loop.time()
+            await (account.claim_insights(daily=True, rank=True) if pipelined else claim_sequential(account))
+            latencies.append(loop.time() - st)
+            sent = sorted(tx[0] for tx in simulator.txs.values() if tx[1] == account.account.address.lower())
+            if len(sent) == 2:
+                send_gaps.append(sent[1] - sent[0])
+        finally:
+            await account.close()
+
+    st = loop.time()
+    results = await asyncio.gather(*[process(idx) for idx in range(1, n + 1)], return_exceptions=True)
+    makespan = loop.time() - st
+    await stop_receipt_trackers()
+    await close_all_sessions()
+    clear_rpc_cache()
+    for r in results:
+        if isinstance(r, Exception):
+            logger.error(f'Account failed: {str(r)}')
+    return {
+        'makespan': makespan,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'same_block': sum(1 for gap in send_gaps if gap == 0) / max(1, len(send_gaps)),
+        'failed': sum(1 for r in results if isinstance(r, Exception)) + n - len(send_gaps),
+    }
+
+
+async def run_suite(args):
+    configs = parse_upstream_configs(args.latency, 0.0, 0.0, None)
+    simulator = UpstreamSimulator(configs, block_time=args.block_time, seed=args.seed)
+    # Enough rank insights to open so both claims are sent
+    simulator.call_results['0x' + INSIGHTS.getQuests(0, '0x' + '00' * 20).data[:4].hex()] = \
+        '0x' + encode(['uint256'], [MIN_INSIGHTS_TO_OPEN]).hex()
+    set_replay_url(await simulator.start())
+    print(f'{"mode":>10} {"accounts":>9} {"makespan s":>11} {"p50 s":>7} {"p99 s":>7} {"same block":>11} '
+          f'{"failed":>7}', file=sys.stderr)
+    try:
+        for pipelined in (False, True):
+            r = await run(simulator, args.accounts, pipelined)
+            mode = 'pipelined' if pipelined else 'sequential'
+            print(f'{mode:>10} {args.accounts:>9} {r["makespan"]:>11.1f} {r["p50"]:>7.2f} {r["p99"]:>7.2f} '
+                  f'{r["same_block"]:>11.0%} {r["failed"]:>7}', file=sys.stderr)
+    finally:
+        set_replay_url(None)
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Daily and rank insight claims of one account, each confirmed before '
+                                                 'the next or sent back-to-back and confirmed together. Virtual clock')
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.1, help='mean upstream latency in seconds')
+    parser.add_argument('--block-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    loop = VirtualTimeEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run_suite(args))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import json
+import asyncio
+import argparse
+from aiohttp import web
+from collections import defaultdict
+from loguru import logger
+from typing import Dict, List, Tuple
+from yarl import URL
+
+from transport import REPLAY_ORIGIN_HEADER
+
+
+def _normalize_body(body: str) -> Tuple[str, object]:
+    try:
+        data = json.loads(body)
+    except (ValueError, TypeError):
+        return body or '', None
+    if isinstance(data, dict) and 'jsonrpc' in data:
+        return json.dumps({k: v for k, v in data.items() if k != 'id'}, sort_keys=True), data.get('id')
+    if isinstance(data, list) and all(isinstance(d, dict) and 'jsonrpc' in d for d in data):
+        return json.dumps([{k: v for k, v in d.items() if k != 'id'} for d in data], sort_keys=True), \
+            [d.get('id') for d in data]
+    return json.dumps(data, sort_keys=True), None
+
+
+def _with_rpc_ids(response: str, ids) -> str:
+    if ids is None or response is None:
+        return response
+    try:
+        data = json.loads(response)
+    except ValueError:
+        return response
+    if isinstance(data, dict) and not isinstance(ids, list):
+        data['id'] = ids
+    elif isinstance(data, list) and isinstance(ids, list):
+        for d, request_id in zip(data, ids):
+            d['id'] = request_id
+    return json.dumps(data)
+
+
+class ReplayServer:
+
+    def __init__(self, filename: str, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+        self.exact: Dict[Tuple[str, str, str], List[dict]] = defaultdict(list)
+        self.loose: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        self.cursors: Dict[tuple, int] = defaultdict(int)
+        self.served = 0
+        self.missed = 0
+        with open(filename, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip() == '':
+                    continue
+                record = json.loads(line)
+                url = URL(record['url'])
+                location = str(url.origin()) + url.raw_path_qs
+                self.exact[(record['method'], location, _normalize_body(record['body'])[0])].append(record)
+                self.loose[(record['method'], location)].append(record)
+        logger.info(f'Loaded {sum(len(r) for r in self.loose.values())} recorded exchanges from {filename}')
+
+    def _next(self, key: tuple, records: List[dict]) -> dict:
+        idx = self.cursors[key]
+        self.cursors[key] = idx + 1
+        return records[idx % len(records)]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        origin = request.headers.get(REPLAY_ORIGIN_HEADER, '')
+        location = origin + request.rel_url.raw_path_qs
+        body, ids = _normalize_body(await request.text())
+
+        key = (request.method, location, body)
+        if key in self.exact:
+            record = self._next(key, self.exact[key])
+        elif (request.method, location) in self.loose:
+            record = self._next(key[:2], self.loose[key[:2]])
+        else:
+            self.missed += 1
+            logger.warning(f'No recording for {request.method} {location}')
+            return web.Response(status=599, text='No recording')
+
+        self.served += 1
+        await asyncio.sleep(record['elapsed'] * self.latency_scale)
+        response = web.Response(status=record['status'], text=_with_rpc_ids(record['response'], ids) or '')
+        for name, value in record['headers']:
+            if name.lower() == 'content-type':
+                response.content_type = value.split(';')[0]
+            else:
+                response.headers.add(name, value)
+        return response
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--file', default='results/recordings.jsonl')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply recorded latencies, 0 for none')
+    args = parser.parse_args()
+
+    server = ReplayServer(args.file, args.scale)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import sys
+import asyncio
+import argparse
+from types import SimpleNamespace
+from loguru import logger
+
+from async_web3 import async_rpc_cache_middleware, clear_rpc_cache
+
+
+class FakeUpstream:
+
+    def __init__(self, latency: float, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    async def make_request(self, method, params):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise Exception('Simulated upstream error')
+        return {'jsonrpc': '2.0', 'id': self.calls, 'result': hex(self.calls)}
+
+
+async def outcome(task: asyncio.Task, timeout: float) -> str:
+    try:
+        return str((await asyncio.wait_for(asyncio.shield(task), timeout))['result'])
+    except asyncio.TimeoutError:
+        task.cancel()
+        return 'hang'
+    except asyncio.CancelledError:
+        return 'cancelled'
+    except Exception as e:
+        return f'error: {str(e)}'
+
+
+async def run_case(name: str, waiters: int, cancel: str, fail: bool, latency: float) -> tuple:
+    # cancel: 'owner' cancels the task that sent the shared request, 'waiter' one of the tasks joined to it
+    clear_rpc_cache()
+    upstream = FakeUpstream(latency, fail)
+    w3 = SimpleNamespace(provider=SimpleNamespace(endpoint_uri='http://rpc.local'))
+    middleware = await async_rpc_cache_middleware(upstream.make_request, w3)
+
+    owner = asyncio.create_task(middleware('eth_blockNumber', []))
+    await asyncio.sleep(0)
+    joined = [asyncio.create_task(middleware('eth_blockNumber', [])) for _ in range(waiters)]
+    await asyncio.sleep(latency / 2)
+    if cancel == 'owner':
+        owner.cancel()
+    elif cancel == 'waiter':
+        joined[0].cancel()
+    results = [await outcome(t, latency * 20) for t in [owner] + joined]
+    return name, results, upstream.calls
+
+
+def check(name: str, results: list, calls: int) -> str:
+    owner, waiters = results[0], results[1:]
+    if 'hang' in results:
+        return 'request hangs'
+    if name == 'owner cancelled':
+        if owner != 'cancelled' or any(r != '0x2' for r in waiters) or calls != 2:
+            return 'waiters should share one new request'
+    elif name == 'waiter cancelled':
+        if owner != '0x1' or waiters[0] != 'cancelled' or any(r != '0x1' for r in waiters[1:]) or calls != 1:
+            return 'only the cancelled waiter should stop'
+    elif name == 'upstream error':
+        if any(not r.startswith('error') for r in results) or calls != 1:
+            return 'all callers should get the shared error'
+    elif any(r != '0x1' for r in results) or calls != 1:
+        return 'all callers should share one request'
+    return ''
+
+
+async def run_suite(args):
+    cases = [
+        ('shared', args.waiters, '', False),
+        ('owner cancelled', args.waiters, 'owner', False),
+        ('waiter cancelled', args.waiters, 'waiter', False),
+        ('upstream error', args.waiters, '', True),
+    ]
+    failed = 0
+    print(f'{"case":>18} {"upstream calls":>15} {"error":>8}', file=sys.stderr)
+    for name, waiters, cancel, fail in cases:
+        name, results, calls = await run_case(name, waiters, cancel, fail, args.latency)
+        error = check(name, results, calls)
+        failed += error != ''
+        print(f'{name:>18} {calls:>15} {error or "-":>8}', file=sys.stderr)
+    clear_rpc_cache()
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared in-flight RPC requests when the sending task is cancelled')
+    parser.add_argument('--waiters', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.05, help='upstream latency in seconds')
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    sys.exit(0 if asyncio.run(run_suite(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
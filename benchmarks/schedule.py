@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from loguru import logger
+
+import main as runner
+from storage import Storage
+from async_web3 import close_all_sessions, clear_rpc_cache
+from gas_oracle import stop_gas_oracle
+from claims import stop_claim_scheduler
+from receipts import stop_receipt_trackers
+from broadcast import stop_tx_broadcaster
+from loopmon import stop_loop_monitor
+from nonces import get_nonce_manager
+from transport import set_replay_url
+from benchmarks.simulator import UpstreamSimulator, UPSTREAMS, parse_upstream_configs
+from benchmarks.throughput import make_accounts, percentile
+from benchmarks.virtual_clock import VirtualTimeEventLoop
+
+
+async def run(simulator: UpstreamSimulator, n: int, threads: int, wait: tuple) -> dict:
+    loop = asyncio.get_running_loop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'data.json')
+        open(filename, 'w').close()
+        storage = Storage(filename)
+        storage.init()
+        data = make_accounts(n, storage, True)
+
+        latencies = []
+
+        async def timed_account(account_data, _storage, invites):
+            st = loop.time()
+            try:
+                return await runner.execute_account(account_data, _storage, invites)
+            finally:
+                latencies.append(loop.time() - st)
+
+        batches = [data[i::threads] for i in range(threads)]
+        simulator.reset_stats()
+        jumps_before = loop.clock.jumps
+        st, real_st = loop.time(), time.perf_counter()
+        results = await runner.process(batches, storage, None, timed_account, sleep=True, wait=wait)
+        makespan, real_elapsed = loop.time() - st, time.perf_counter() - real_st
+
+        await stop_claim_scheduler()
+        await stop_gas_oracle()
+        await stop_receipt_trackers()
+        await stop_tx_broadcaster()
+        await close_all_sessions()
+        await stop_loop_monitor()
+        clear_rpc_cache()
+        get_nonce_manager().nonces.clear()
+
+    busy = sum(latencies)
+    return {
+        'failed': sum(len(r[0]) for r in results),
+        'makespan': makespan,
+        'real': real_elapsed,
+        'worker_idle': 1 - busy / (makespan * threads) if makespan > 0 else 0,
+        'jumps': loop.clock.jumps - jumps_before,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'rates': {u: (simulator.requests[u] / makespan if makespan > 0 else 0, simulator.peak_rate(u))
+                  for u in UPSTREAMS},
+    }
+
+
+async def run_suite(args):
+    configs = parse_upstream_configs(args.latency, args.error_rate, args.rate_limit_rate, args.upstreams)
+    simulator = UpstreamSimulator(configs, block_time=args.block_time, seed=args.seed)
+    set_replay_url(await simulator.start())
+    rates_header = ' '.join(f'{u + " r/s":>14}' for u in UPSTREAMS)
+    print(f'{"accounts":>9} {"threads":>8} {"wait s":>9} {"makespan s":>11} {"real s":>7} {"worker idle":>12} '
+          f'{"jumps":>8} {"p50 s":>7} {"p99 s":>7} {"failed":>7} {rates_header}', file=sys.stderr)
+    try:
+        for threads in args.threads:
+            r = await run(simulator, args.accounts, threads, tuple(args.wait))
+            rates = ' '.join(f'{f"{avg:.1f}/{peak}":>14}' for avg, peak in r['rates'].values())
+            print(f'{args.accounts:>9} {threads:>8} {f"{args.wait[0]:g}-{args.wait[1]:g}":>9} '
+                  f'{r["makespan"]:>11.0f} {r["real"]:>7.1f} {r["worker_idle"]:>12.1%} {r["jumps"]:>8} '
+                  f'{r["p50"]:>7.2f} {r["p99"]:>7.2f} {r["failed"]:>7} {rates}', file=sys.stderr)
+    finally:
+        set_replay_url(None)
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a fleet run on a virtual clock against simulated upstreams. '
+                                                 'Request rates are average/peak per virtual second')
+    parser.add_argument('--accounts', type=int, default=500)
+    parser.add_argument('--threads', type=int, nargs='*', default=[1, 5, 20])
+    parser.add_argument('--wait', type=float, nargs=2, default=list(runner.WAIT_BETWEEN_ACCOUNTS),
+                        help='WAIT_BETWEEN_ACCOUNTS range in seconds')
+    parser.add_argument('--latency', type=float, default=0.3, help='mean upstream latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of 429 responses')
+    parser.add_argument('--upstreams', default=None,
+                        help='per-upstream overrides as JSON, e.g. \'{"rpc": {"latency": 0.2}}\'')
+    parser.add_argument('--block-time', type=float, default=12.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    loop = VirtualTimeEventLoop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(run_suite(args))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    main()
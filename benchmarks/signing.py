@@ -0,0 +1,50 @@
+import os
+import time
+import asyncio
+import argparse
+from eth_account import Account as EthAccount
+
+from signer import SigningService
+
+
+def make_txs(n: int):
+    keys = [EthAccount.create().key.hex() for _ in range(min(n, 100))]
+    return [({
+        'chainId': 204,
+        'nonce': i,
+        'to': '0x73A0469348BcD7AAF70D9E34BBFa794deF56081F',
+        'data': b'\x1f\x54\xb3\x0a' + os.urandom(128),
+        'gas': 300000,
+        'maxPriorityFeePerGas': 10000,
+        'maxFeePerGas': 10024,
+    }, keys[i % len(keys)]) for i in range(n)]
+
+
+async def run(service: SigningService, items, bulk: bool) -> float:
+    st = time.perf_counter()
+    if bulk:
+        await service.sign_many(items)
+    else:
+        await asyncio.gather(*[service.sign(tx, key) for tx, key in items])
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=2000)
+    parser.add_argument('--processes', type=int, nargs='*', default=[0, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    items = make_txs(args.n)
+    print(f'{"processes":>10} {"mode":>8} {"sig/s":>10}')
+    for processes in args.processes:
+        service = SigningService(processes)
+        asyncio.run(run(service, items[:processes * 2 or 1], True))
+        for bulk in (False, True):
+            elapsed = asyncio.run(run(service, items, bulk))
+            print(f'{processes:>10} {"bulk" if bulk else "single":>8} {args.n / elapsed:>10.0f}')
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
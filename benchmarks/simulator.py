@@ -0,0 +1,306 @@
+import os
+import rlp
+import json
+import random
+import asyncio
+from aiohttp import web
+from collections import Counter
+from dataclasses import dataclass
+from eth_account import Account as EthAccount
+from eth_utils import keccak, to_bytes
+from typing import Dict, Optional, Set, Tuple
+
+from transport import REPLAY_ORIGIN_HEADER
+
+
+@dataclass
+class UpstreamConfig:
+    latency: float = 0.05  # in seconds
+    jitter: float = 0.5  # fraction of latency
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: int = 1  # in seconds
+
+
+UPSTREAMS = ('well3', 'google', 'twitter', 'rpc')
+
+AUTH_API_URL = 'https://well3.com/assets/__/auth/handler'
+AIRDROP_AMOUNT = str(1000 * 10 ** 18)
+GWEI = 10 ** 9
+
+
+def get_upstream(origin: str) -> str:
+    if 'gm.io' in origin:
+        return 'well3'
+    if 'googleapis.com' in origin:
+        return 'google'
+    if 'twitter.com' in origin or 'x.com' in origin:
+        return 'twitter'
+    return 'rpc'
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+class UpstreamSimulator:
+
+    def __init__(self, configs: Dict[str, UpstreamConfig] = None, block_time: float = 1.0,
+                 base_fee: int = GWEI, seed: Optional[int] = None):
+        self.configs = {name: UpstreamConfig() for name in UPSTREAMS}
+        self.configs.update(configs or {})
+        self.block_time = block_time
+        self.base_fee = base_fee
+        self.random = random.Random(seed)
+        self.requests = Counter()
+        self.rpc_calls = Counter()
+        self.statuses = Counter()
+        self.timeline = Counter()
+        self.txs: Dict[str, Tuple[int, str, int]] = {}  # hash -> sent block, sender, nonce
+        self.nonces: Dict[str, Set[int]] = {}  # sender -> nonces seen in the mempool
+        self.call_results: Dict[str, str] = {}  # 4-byte selector -> eth_call result, zeros otherwise
+        self.start_time: Optional[float] = None
+        self.runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+    def reset_stats(self):
+        self.requests.clear()
+        self.rpc_calls.clear()
+        self.statuses.clear()
+        self.timeline.clear()
+
+    def pending_count(self, address: str) -> int:
+        # Like the node: the first nonce with no tx, txs above a gap stay queued and never mine
+        nonces = self.nonces.get(address.lower(), set())
+        count = 0
+        while count in nonces:
+            count += 1
+        return count
+
+    def nonce_gaps(self, address: str) -> int:
+        return len([n for n in self.nonces.get(address.lower(), set()) if n > self.pending_count(address)])
+
+    def send_raw_transaction(self, raw_hex: str) -> dict:
+        raw = to_bytes(hexstr=raw_hex)
+        fields = rlp.decode(raw[1:]) if raw[0] <= 0x7f else rlp.decode(raw)
+        nonce = int.from_bytes(fields[1] if raw[0] <= 0x7f else fields[0], 'big')
+        sender = EthAccount.recover_transaction(raw).lower()
+        tx_hash = '0x' + keccak(raw).hex()
+        if tx_hash in self.txs:
+            return {'error': {'code': -32000, 'message': 'already known'}}
+        if nonce in self.nonces.get(sender, set()):
+            return {'error': {'code': -32000, 'message': 'replacement transaction underpriced'}}
+        self.nonces.setdefault(sender, set()).add(nonce)
+        self.txs[tx_hash] = (self.block_number, sender, nonce)
+        return {'result': tx_hash}
+
+    @property
+    def block_number(self) -> int:
+        now = asyncio.get_running_loop().time()
+        if self.start_time is None:
+            self.start_time = now
+        return 1000000 + int((now - self.start_time) / self.block_time)
+
+    async def _delay(self, config: UpstreamConfig):
+        latency = config.latency * (1 + self.random.uniform(-config.jitter, config.jitter))
+        if latency > 0:
+            await asyncio.sleep(latency)
+
+    def _fault(self, config: UpstreamConfig) -> Optional[web.Response]:
+        value = self.random.random()
+        if value < config.error_rate:
+            return web.Response(status=500, text='Simulated upstream error')
+        if value < config.error_rate + config.rate_limit_rate:
+            return web.Response(status=429, text='Too Many Requests', headers={'Retry-After': str(config.retry_after)})
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        upstream = get_upstream(request.headers.get(REPLAY_ORIGIN_HEADER, ''))
+        config = self.configs[upstream]
+        self.requests[upstream] += 1
+        self.timeline[(upstream, int(asyncio.get_running_loop().time()))] += 1
+        await self._delay(config)
+        response = self._fault(config)
+        if response is None:
+            match upstream:
+                case 'well3':
+                    response = self.handle_well3(request)
+                case 'google':
+                    response = await self.handle_google(request)
+                case 'twitter':
+                    response = self.handle_twitter(request)
+                case _:
+                    response = await self.handle_rpc(request)
+        self.statuses[(upstream, response.status)] += 1
+        return response
+
+    def handle_well3(self, request: web.Request) -> web.Response:
+        path = request.path
+        if path == '/ygpz/me':
+            token = request.headers.get('authorization', '')
+            return web.json_response({
+                'user': {'userId': 'user-' + token[-12:]},
+                'socialProfiles': {'twitter': {'username': 'sim'}},
+                'referralInfo': {'myReferrer': {'userId': 'referrer'}, 'myReferralCodes': []},
+                'ygpzQuesting': {
+                    'info': {'exp': 100, 'rank': 1, 'dailyProgress': {}},
+                    'pendingVerify': [],
+                },
+                'contractInfo': {
+                    'linkedAddress': '0x' + '00' * 20,
+                    'dailyQuest': {'nonce': '0x' + os.urandom(32).hex(), 'signature': '0x' + os.urandom(65).hex()},
+                    'rankupQuest': {'currentRank': 1, 'signature': '0x' + os.urandom(65).hex()},
+                },
+                'dailyBonusInfo': {'status': {'superQuestEligible': False}},
+                'wellGiveawayByBitAcc': '',
+            })
+        if path == '/well-giveaway/sig2':
+            return web.json_response(['0x' + os.urandom(65).hex(), AIRDROP_AMOUNT])
+        if path == '/well-giveaway/sig':
+            return web.Response(text='0x' + os.urandom(65).hex())
+        return web.json_response({})
+
+    async def handle_google(self, request: web.Request) -> web.Response:
+        path = request.path
+        if path.endswith('createAuthUri'):
+            return web.json_response({
+                'authUri': 'https://api.twitter.com/oauth/authenticate?oauth_token=' + os.urandom(8).hex(),
+                'sessionId': os.urandom(8).hex(),
+            })
+        if path.endswith('accounts:signInWithIdp'):
+            return web.json_response({
+                'idToken': 'sim-' + os.urandom(16).hex(),
+                'expiresIn': '3600',
+                'localId': os.urandom(8).hex(),
+                'oauthAccessToken': os.urandom(8).hex(),
+                'oauthTokenSecret': os.urandom(8).hex(),
+                'refreshToken': 'sim-refresh-' + os.urandom(8).hex(),
+            })
+        if path.endswith('/token'):
+            return web.json_response({
+                'id_token': 'sim-' + os.urandom(16).hex(),
+                'expires_in': '3600',
+                'refresh_token': 'sim-refresh-' + os.urandom(8).hex(),
+            })
+        return web.json_response({'error': 'Not Found'}, status=404)
+
+    def handle_twitter(self, request: web.Request) -> web.Response:
+        if request.path.startswith('/oauth/'):
+            oauth_token = request.query.get('oauth_token', '')
+            return web.Response(text=f'<a href="{AUTH_API_URL}?state={os.urandom(8).hex()}&amp;'
+                                     f'oauth_token={oauth_token}&amp;oauth_verifier={os.urandom(8).hex()}">',
+                                content_type='text/html')
+        response = web.json_response({'screen_name': 'sim'})
+        response.set_cookie('ct0', os.urandom(16).hex(), max_age=3600)
+        return response
+
+    async def handle_rpc(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self.rpc_result(r) for r in body])
+        return web.json_response(self.rpc_result(body))
+
+    def rpc_result(self, rpc_request: dict) -> dict:
+        method, params = rpc_request['method'], rpc_request.get('params') or []
+        self.rpc_calls[method] += 1
+        result = None
+        match method:
+            case 'eth_chainId':
+                result = _hex(1)
+            case 'eth_blockNumber':
+                result = _hex(self.block_number)
+            case 'eth_getTransactionCount':
+                result = _hex(self.pending_count(params[0]))
+            case 'eth_estimateGas':
+                result = _hex(120000)
+            case 'eth_call':
+                result = self.call_results.get(params[0].get('data', params[0].get('input', ''))[:10], '0x' + '00' * 32)
+            case 'eth_gasPrice':
+                result = _hex(self.base_fee)
+            case 'eth_maxPriorityFeePerGas':
+                result = _hex(GWEI // 10)
+            case 'eth_feeHistory':
+                blocks = int(params[0], 16) if isinstance(params[0], str) else params[0]
+                result = {
+                    'oldestBlock': _hex(self.block_number - blocks + 1),
+                    'baseFeePerGas': [_hex(self.base_fee)] * (blocks + 1),
+                    'gasUsedRatio': [0.5] * blocks,
+                    'reward': [[_hex(GWEI // 10)] for _ in range(blocks)],
+                }
+            case 'eth_sendRawTransaction':
+                response = self.send_raw_transaction(params[0])
+                if 'error' in response:
+                    return {'jsonrpc': '2.0', 'id': rpc_request.get('id'), 'error': response['error']}
+                result = response['result']
+            case 'eth_getTransactionReceipt':
+                result = self.receipt(params[0])
+            case 'eth_getTransactionByHash':
+                result = self.transaction(params[0])
+            case 'eth_getLogs':
+                result = []
+            case _:
+                return {'jsonrpc': '2.0', 'id': rpc_request.get('id'),
+                        'error': {'code': -32601, 'message': f'Method {method} is not simulated'}}
+        return {'jsonrpc': '2.0', 'id': rpc_request.get('id'), 'result': result}
+
+    def transaction(self, tx_hash: str) -> Optional[dict]:
+        if tx_hash not in self.txs:
+            return None
+        _, sender, nonce = self.txs[tx_hash]
+        return {'hash': tx_hash, 'from': sender, 'nonce': _hex(nonce), 'blockHash': None, 'blockNumber': None,
+                'transactionIndex': None}
+
+    def receipt(self, tx_hash: str) -> Optional[dict]:
+        if tx_hash not in self.txs:
+            return None
+        sent_block, sender, nonce = self.txs[tx_hash]
+        if self.block_number <= sent_block or nonce >= self.pending_count(sender):
+            return None
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockHash': '0x' + keccak(text=str(sent_block + 1)).hex(),
+            'blockNumber': _hex(sent_block + 1),
+            'from': '0x' + '00' * 20,
+            'to': '0x' + '00' * 20,
+            'cumulativeGasUsed': _hex(100000),
+            'gasUsed': _hex(100000),
+            'effectiveGasPrice': _hex(self.base_fee),
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': '0x1',
+            'type': '0x2',
+        }
+
+    def peak_rate(self, upstream: str) -> int:
+        return max([cnt for (name, _), cnt in self.timeline.items() if name == upstream], default=0)
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self.handle)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def parse_upstream_configs(latency: float, error_rate: float, rate_limit_rate: float,
+                           overrides: str = None) -> Dict[str, UpstreamConfig]:
+    configs = {name: UpstreamConfig(latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate)
+               for name in UPSTREAMS}
+    for name, values in json.loads(overrides or '{}').items():
+        for key, value in values.items():
+            setattr(configs[name], key, value)
+    return configs
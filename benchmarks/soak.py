@@ -0,0 +1,120 @@
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from loguru import logger
+
+import main as runner
+from storage import Storage
+from logsink import install_log_sink, get_log_sink
+from memtrack import MemoryTracker, memory_stats
+from transport import set_replay_url
+from benchmarks.simulator import UpstreamSimulator, parse_upstream_configs
+from benchmarks.throughput import make_accounts
+
+
+def start_simulator(simulator: UpstreamSimulator):
+    # main() creates and closes its own loop every cycle, so upstreams live on a loop of their own
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name='simulator', daemon=True).start()
+    return loop, asyncio.run_coroutine_threadsafe(simulator.start(), loop).result()
+
+
+def stop_simulator(simulator: UpstreamSimulator, loop: asyncio.AbstractEventLoop):
+    asyncio.run_coroutine_threadsafe(simulator.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def prepare_workdir(workdir: str, n: int):
+    for name in ('files', 'storage', 'results', 'logs'):
+        os.makedirs(os.path.join(workdir, name), exist_ok=True)
+    filename = os.path.join(workdir, 'storage', 'data.json')
+    open(filename, 'w').close()
+    storage = Storage(filename)
+    storage.init()
+    data = make_accounts(n, storage, True)
+    storage.save()
+    columns = {
+        'wallets': [key for _, (key, *_) in data],
+        'proxies': ['http://127.0.0.1:1' for _ in data],
+        'twitters': [twitter for _, (_, _, twitter, *_) in data],
+        'prompts': ['' for _ in data],
+        'bybits': ['' for _ in data],
+        'invites': [],
+    }
+    for name, lines in columns.items():
+        with open(os.path.join(workdir, 'files', f'{name}.txt'), 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines))
+
+
+def check_growth(rows: list, warmup: int, max_rss_growth: float) -> list:
+    base, last = rows[warmup - 1], rows[-1]
+    problems = []
+    for key in ('sessions', 'loops', 'threads', 'fds'):
+        if last[key] > base[key]:
+            problems.append(f'{key} grew from {base[key]} to {last[key]}')
+    if last['rss_mb'] - base['rss_mb'] > max_rss_growth:
+        problems.append(f'RSS grew by {last["rss_mb"] - base["rss_mb"]:.0f} MB')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many accelerated LOOP_RUNS cycles of main() against simulated '
+                                                 'upstreams and fail if memory, sessions or loops keep growing')
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--accounts', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=10)
+    parser.add_argument('--warmup', type=int, default=3, help='cycles before the baseline is taken')
+    parser.add_argument('--max-rss-growth', type=float, default=30, help='allowed RSS growth after warmup in MB')
+    parser.add_argument('--tracemalloc', action='store_true', help='log top allocation growth after every cycle')
+    parser.add_argument('--latency', type=float, default=0.01, help='mean upstream latency in seconds')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    if args.cycles <= args.warmup:
+        parser.error('--cycles must be greater than --warmup')
+
+    install_log_sink()
+    get_log_sink().stream = open(os.devnull, 'w')
+    logger.remove()
+    logger.add(sys.stderr, level='INFO', filter={'': 'WARNING', 'memtrack': 'INFO'})
+
+    simulator = UpstreamSimulator(parse_upstream_configs(args.latency, 0.0, 0.0), seed=args.seed)
+    sim_loop, url = start_simulator(simulator)
+    set_replay_url(url)
+    tracker = MemoryTracker()
+    if args.tracemalloc:
+        tracker.start()
+
+    cwd = os.getcwd()
+    rows = []
+    print(f'{"cycle":>6} {"rss MB":>8} {"traced MB":>10} {"sessions":>9} {"loops":>6} {"threads":>8} {"fds":>5}', file=sys.stderr)
+    try:
+        with tempfile.TemporaryDirectory() as workdir, open(os.devnull, 'w') as devnull:
+            prepare_workdir(workdir, args.accounts)
+            os.chdir(workdir)
+            try:
+                for cycle in range(1, args.cycles + 1):
+                    with redirect_stdout(devnull):
+                        runner.main(threads_num=args.threads, wait=(0, 0))
+                    stats = tracker.checkpoint() if args.tracemalloc else memory_stats()
+                    rows.append(stats)
+                    print(f'{cycle:>6} {stats["rss_mb"]:>8.1f} {stats["traced_mb"]:>10.1f} {stats["sessions"]:>9} '
+                          f'{stats["loops"]:>6} {stats["threads"]:>8} {stats["fds"]:>5}', file=sys.stderr)
+            finally:
+                os.chdir(cwd)
+    finally:
+        set_replay_url(None)
+        stop_simulator(simulator, sim_loop)
+
+    problems = check_growth(rows, args.warmup, args.max_rss_growth)
+    if len(problems) > 0:
+        print(f'FAIL: {", ".join(problems)} after cycle {args.warmup}', file=sys.stderr)
+        sys.exit(1)
+    print(f'OK: {args.cycles} cycles', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+from loguru import logger
+from eth_account import Account as EthAccount
+
+import main as runner
+from storage import Storage
+from models import AccountInfo
+from async_web3 import close_all_sessions, clear_rpc_cache
+from gas_oracle import stop_gas_oracle
+from claims import stop_claim_scheduler
+from receipts import stop_receipt_trackers
+from broadcast import stop_tx_broadcaster
+from loopmon import stop_loop_monitor
+from nonces import get_nonce_manager
+from transport import set_replay_url
+from benchmarks.simulator import UpstreamSimulator, parse_upstream_configs
+
+
+def make_accounts(n: int, storage: Storage, warm: bool):
+    keys = [EthAccount.create().key.hex() for _ in range(n)]
+    data = []
+    for idx, key in enumerate(keys, start=1):
+        address = EthAccount.from_key(key).address
+        data.append((idx, (key, '', f'twitter-{idx}', '', '')))
+        if warm:
+            storage.set_final_account_info(address, AccountInfo(
+                address=address, twitter_auth_token=f'twitter-{idx}',
+                well3_auth_token=f'sim-{idx}', well3_auth_token_expire_at=int(time.time()) + 3600 * 24,
+                well3_refresh_token=f'sim-refresh-{idx}',
+            ))
+    return data
+
+
+def percentile(values, p: float) -> float:
+    if len(values) == 0:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def run(simulator: UpstreamSimulator, n: int, threads: int, warm: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'data.json')
+        open(filename, 'w').close()
+        storage = Storage(filename)
+        storage.init()
+        data = make_accounts(n, storage, warm)
+
+        latencies = []
+
+        async def timed_account(account_data, _storage, invites):
+            st = time.perf_counter()
+            try:
+                return await runner.execute_account(account_data, _storage, invites)
+            finally:
+                latencies.append(time.perf_counter() - st)
+
+        batches = [data[i::threads] for i in range(threads)]
+        simulator.reset_stats()
+        st = time.perf_counter()
+        results = await runner.process(batches, storage, None, timed_account, sleep=False)
+        elapsed = time.perf_counter() - st
+
+        await stop_claim_scheduler()
+        await stop_gas_oracle()
+        await stop_receipt_trackers()
+        await stop_tx_broadcaster()
+        await close_all_sessions()
+        await stop_loop_monitor()
+        clear_rpc_cache()
+        get_nonce_manager().nonces.clear()
+
+    failed = sum(len(r[0]) for r in results)
+    return {
+        'accounts': n,
+        'failed': failed,
+        'elapsed': elapsed,
+        'acc_per_sec': n / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'rpc_per_acc': sum(simulator.rpc_calls.values()) / n,
+        'http_per_acc': sum(simulator.requests.values()) / n,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+async def run_suite(args):
+    configs = parse_upstream_configs(args.latency, args.error_rate, args.rate_limit_rate, args.upstreams)
+    simulator = UpstreamSimulator(configs, block_time=args.block_time, seed=args.seed)
+    set_replay_url(await simulator.start())
+    print(f'{"accounts":>9} {"threads":>8} {"acc/s":>8} {"p50 s":>8} {"p99 s":>8} {"rpc/acc":>8} '
+          f'{"http/acc":>9} {"failed":>7} {"rss MB":>8}', file=sys.stderr)
+    try:
+        for n in args.accounts:
+            for threads in args.threads:
+                r = await run(simulator, n, threads, not args.cold)
+                print(f'{r["accounts"]:>9} {threads:>8} {r["acc_per_sec"]:>8.1f} {r["p50"]:>8.3f} '
+                      f'{r["p99"]:>8.3f} {r["rpc_per_acc"]:>8.1f} {r["http_per_acc"]:>9.1f} '
+                      f'{r["failed"]:>7} {r["peak_rss_mb"]:>8.0f}', file=sys.stderr)
+    finally:
+        set_replay_url(None)
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end claim throughput against local simulated upstreams')
+    parser.add_argument('--accounts', type=int, nargs='*', default=[1000])
+    parser.add_argument('--threads', type=int, nargs='*', default=[100])
+    parser.add_argument('--latency', type=float, default=0.05, help='mean upstream latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of 429 responses')
+    parser.add_argument('--upstreams', default=None,
+                        help='per-upstream overrides as JSON, e.g. \'{"rpc": {"latency": 0.2}}\'')
+    parser.add_argument('--block-time', type=float, default=1.0)
+    parser.add_argument('--cold', action='store_true', help='sign in through Google and Twitter for every account')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='WARNING')
+    asyncio.run(run_suite(args))
+
+
+if __name__ == '__main__':
+    main()
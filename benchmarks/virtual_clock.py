@@ -0,0 +1,94 @@
+import time
+import asyncio
+import selectors
+from loguru import logger
+from typing import Callable, Optional
+
+
+class VirtualClock:
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+        self.idle = 0.0
+        self.jumps = 0
+
+    def advance(self, seconds: float):
+        self.now += seconds
+        self.idle += seconds
+        self.jumps += 1
+
+
+class VirtualSelector(selectors.BaseSelector):
+    # The clock jumps to the next timer only when no real I/O is in flight, so aiohttp timeouts
+    # never fire while a request or a response is still on its way
+
+    def __init__(self, clock: VirtualClock, jobs: Callable[[], int], poll: float = 0.01, max_wait: float = 10.0):
+        self.clock = clock
+        self.jobs = jobs
+        self.poll = poll
+        self.max_wait = max_wait
+        self.selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self.selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self.selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self.selector.modify(fileobj, events, data)
+
+    def get_key(self, fileobj):
+        return self.selector.get_key(fileobj)
+
+    def get_map(self):
+        return self.selector.get_map()
+
+    def close(self):
+        self.selector.close()
+
+    def io_pending(self) -> bool:
+        # Executor jobs include getaddrinfo. Asyncio registers writers only while a connect or a write is unfinished,
+        # readers stay registered on idle keep-alive connections and say nothing
+        if self.jobs() > 0:
+            return True
+        return any(key.events & selectors.EVENT_WRITE for key in self.selector.get_map().values())
+
+    def select(self, timeout: Optional[float] = None):
+        events = self.selector.select(0)
+        if len(events) > 0:
+            return events
+        if timeout is None:
+            return self.selector.select(None)
+        if timeout <= 0:
+            return []
+        start = time.monotonic()
+        while self.io_pending():
+            events = self.selector.select(self.poll)
+            if len(events) > 0:
+                return events
+            if time.monotonic() - start > self.max_wait:
+                logger.warning(f'Real I/O pending for {self.max_wait}s, advancing virtual time anyway')
+                break
+        self.clock.advance(timeout)
+        return []
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self, clock: VirtualClock = None):
+        self.clock = clock or VirtualClock()
+        self.executor_jobs = 0
+        super().__init__(VirtualSelector(self.clock, lambda: self.executor_jobs))
+
+    def time(self) -> float:
+        return self.clock.now
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self.executor_jobs += 1
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, _):
+        self.executor_jobs -= 1
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from loguru import logger
+from statistics import median
+from typing import Dict, List, Optional, Set, Tuple, cast
+from web3 import AsyncWeb3
+
+from async_web3 import AsyncHTTPProviderWithProxy
+from config import BROADCAST_RPCS
+from utils import get_w3, close_w3
+
+
+class EndpointStats:
+    __slots__ = ('sent', 'accepted', 'first', 'failed', 'latencies')
+
+    def __init__(self):
+        self.sent = 0
+        self.accepted = 0
+        self.first = 0
+        self.failed = 0
+        self.latencies: List[float] = []
+
+
+class TxBroadcaster:
+
+    def __init__(self, extra_rpcs: Dict[str, List[str]] = None):
+        self.extra_rpcs = BROADCAST_RPCS if extra_rpcs is None else extra_rpcs
+        self.loop = asyncio.get_running_loop()
+        self.stats: Dict[str, EndpointStats] = {}
+        self.tasks: Set[asyncio.Task] = set()
+        self.w3s: Dict[Tuple[str, Optional[str]], AsyncWeb3] = {}
+
+    def _get_w3s(self, w3: AsyncWeb3) -> List[AsyncWeb3]:
+        provider = cast(AsyncHTTPProviderWithProxy, w3.manager.provider)
+        w3s = [w3]
+        for rpc in self.extra_rpcs.get(provider.endpoint_uri, []):
+            key = (rpc, provider.proxy)
+            if key not in self.w3s:
+                self.w3s[key] = get_w3(provider.proxy, rpc=rpc)
+            w3s.append(self.w3s[key])
+        return w3s
+
+    def _on_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _send(self, w3: AsyncWeb3, raw_tx: bytes):
+        endpoint = cast(AsyncHTTPProviderWithProxy, w3.manager.provider).endpoint_uri
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        stats.sent += 1
+        start = time.perf_counter()
+        try:
+            tx_hash = await w3.eth.send_raw_transaction(raw_tx)
+        except Exception:
+            stats.failed += 1
+            raise
+        stats.accepted += 1
+        stats.latencies.append(time.perf_counter() - start)
+        return stats, tx_hash
+
+    async def broadcast(self, w3: AsyncWeb3, raw_tx: bytes):
+        tasks = [self.loop.create_task(self._send(_w3, raw_tx)) for _w3 in self._get_w3s(w3)]
+        for task in tasks:
+            self.tasks.add(task)
+            task.add_done_callback(self._on_done)
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                stats, tx_hash = await next_done
+            except Exception:
+                continue
+            stats.first += 1
+            return tx_hash
+        raise tasks[0].exception()
+
+    def log_stats(self):
+        for endpoint, stats in self.stats.items():
+            latency = ''
+            if len(stats.latencies) > 0:
+                latency = f', latency median {median(stats.latencies) * 1000:.0f}ms ' \
+                          f'max {max(stats.latencies) * 1000:.0f}ms'
+            logger.info(f'Broadcast {endpoint}: {stats.accepted}/{stats.sent} accepted, '
+                        f'{stats.first} first, {stats.failed} failed{latency}')
+
+    async def stop(self):
+        if len(self.tasks) > 0:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.log_stats()
+        for w3 in self.w3s.values():
+            await close_w3(w3)
+        self.w3s.clear()
+
+
+_tx_broadcaster: Optional[TxBroadcaster] = None
+
+
+def get_tx_broadcaster() -> TxBroadcaster:
+    global _tx_broadcaster
+    if _tx_broadcaster is None or _tx_broadcaster.loop is not asyncio.get_running_loop():
+        _tx_broadcaster = TxBroadcaster()
+    return _tx_broadcaster
+
+
+async def stop_tx_broadcaster():
+    global _tx_broadcaster
+    if _tx_broadcaster is not None:
+        await _tx_broadcaster.stop()
+        _tx_broadcaster = None
@@ -1,78 +1,141 @@
-import aiohttp
-import aiofiles
+import time
 import asyncio
 
 from termcolor import cprint
 from loguru import logger
-from datetime import datetime
-from typing import Tuple, List
+from typing import Dict, Tuple, List
 from eth_account import Account as EthAccount
 
 from storage import Storage
 from models import AccountInfo
 from twitter import Twitter
-from config import THREADS_NUM, CHECKER_UPDATE_STORAGE
-from utils import async_retry
+from config import CHECKER_THREADS_NUM, CHECKER_UPDATE_STORAGE
+from utils import async_retry, log_long_exc
+from logsink import install_log_sink
+from transport import create_session, stop_recording
+
+
+AUTH_ERRORS = ('Could not authenticate you', 'account is suspended', 'account has been locked',
+               'account is unavailable')
+PROGRESS_EVERY = 100
 
 
 @async_retry
 async def change_ip(link: str):
-    async with aiohttp.ClientSession() as sess:
+    async with create_session() as sess:
         async with sess.get(link) as resp:
             if resp.status != 200:
                 raise Exception(f'Failed to change ip: Status = {resp.status}. Response = {await resp.text()}')
 
 
-async def check_account(account_data: Tuple[int, Tuple[str, str, str]]):
+async def check_account(account_data: Tuple[int, Tuple[str, str, str]], storage: Storage):
     idx, (wallet, proxy, twitter_token) = account_data
     address = EthAccount().from_key(wallet).address
     logger.info(f'{idx}) Processing {address}')
 
     account_info = AccountInfo(address=address, proxy=proxy, twitter_auth_token=twitter_token)
+    stored_info = await storage.get_account_info(address)
+    if stored_info is not None and stored_info.twitter_auth_token == twitter_token:
+        account_info.twitter_ct0 = stored_info.twitter_ct0
+        account_info.twitter_ct0_expire_at = stored_info.twitter_ct0_expire_at
 
     if '|' in account_info.proxy:
         change_link = account_info.proxy.split('|')[1]
         await change_ip(change_link)
         logger.info(f'{idx}) Successfully changed ip')
 
+    # Settings fail for locked and logged out tokens, suspended ones still read them and show up on the profile
     twitter = Twitter(account_info)
-    await twitter.start()
-
-    await twitter.follow('elonmusk')
-
-    return True
-
-
-async def process_batch(bid: int, batch: List[Tuple[int, Tuple[str, str, str]]], async_func):
-    failed = []
-    for idx, d in enumerate(batch):
+    username = await twitter.get_my_username()
+    reason = await twitter.get_unavailable_reason(username)
+    if reason is not None:
+        raise Exception(f'Twitter account is unavailable: {reason}')
+    logger.info(f'{idx}) Token is valid for @{username}')
+
+    if stored_info is not None and stored_info.twitter_auth_token == twitter_token:
+        stored_info.twitter_ct0 = account_info.twitter_ct0
+        stored_info.twitter_ct0_expire_at = account_info.twitter_ct0_expire_at
+        await storage.set_account_info(address, stored_info)
+
+    return address
+
+
+async def worker(queue: asyncio.Queue, results: asyncio.Queue, storage: Storage, async_func):
+    while True:
+        d = await queue.get()
+        if d is None:
+            return
+        st = time.perf_counter()
+        failed = False
         try:
-            await async_func(d)
+            await async_func(d, storage)
         except Exception as e:
-            e_msg = str(e)
-            if 'Could not authenticate you' in e_msg or 'account is suspended' in e_msg \
-                    or 'account has been locked' in e_msg:
-                failed.append(d)
-            if e_msg == '':
-                e_msg = ' '
-            e_msg_lines = e_msg.splitlines()
-            logger.error(f'{d[0]}) Process account error: {e_msg_lines[0]}')
-            if len(e_msg_lines) > 1:
-                async with aiofiles.open('logs/errors.txt', 'a', encoding='utf-8') as file:
-                    await file.write(f'{str(datetime.now())} | {d[0]}) Process account error: {e_msg}')
-                    await file.flush()
+            failed = any(err in str(e) for err in AUTH_ERRORS)
+            await log_long_exc(d[0], 'Process account error', e)
+        await results.put((d, failed, time.perf_counter() - st))
+
 
+async def write_results(results: asyncio.Queue, data: List[Tuple[int, Tuple[str, str, str]]], total: int,
+                        storage: Storage) -> List[Tuple[int, Tuple[str, str, str]]]:
+    failed = []
+    latencies = []
+    # Results come per token in completion order, lines are written in input order once their token is checked
+    checked: Dict[str, bool] = {}
+    next_row = 0
+    st = time.perf_counter()
+    with open('results/working_wallets.txt', 'w', encoding='utf-8') as wallets_file, \
+            open('results/working_proxies.txt', 'w', encoding='utf-8') as proxies_file, \
+            open('results/working_twitters.txt', 'w', encoding='utf-8') as twitters_file:
+        for cnt in range(1, total + 1):
+            d, is_failed, latency = await results.get()
+            latencies.append(latency)
+            checked[d[1][2]] = is_failed
+            while next_row < len(data) and data[next_row][1][2] in checked:
+                idx, (wallet, proxy, twitter) = data[next_row]
+                next_row += 1
+                if checked[twitter]:
+                    failed.append((idx, (wallet, proxy, twitter)))
+                    address = EthAccount().from_key(wallet).address
+                    logger.info(f'Removed for address {address} twitter token {twitter}, proxy {proxy}')
+                    if CHECKER_UPDATE_STORAGE:
+                        storage.remove(address)
+                    continue
+                wallets_file.write(f'{wallet}\n')
+                proxies_file.write(f'{proxy}\n')
+                twitters_file.write(f'{twitter}\n')
+            if cnt % PROGRESS_EVERY == 0 and cnt != total:
+                logger.info(f'Checked {cnt}/{total} tokens: {cnt / (time.perf_counter() - st):.1f} tokens/s')
+
+    elapsed = time.perf_counter() - st
+    if total > 0:
+        latencies.sort()
+        logger.info(f'Checked {total} tokens for {len(data)} accounts in {elapsed:.1f}s: '
+                    f'{total / elapsed:.1f} tokens/s, p50 {latencies[total // 2]:.2f}s, '
+                    f'p99 {latencies[min(total - 1, total * 99 // 100)]:.2f}s')
     return failed
 
 
-async def process(batches: List[List[Tuple[int, Tuple[str, str, str]]]], async_func):
-    tasks = []
-    for idx, b in enumerate(batches):
-        tasks.append(asyncio.create_task(process_batch(idx, b, async_func)))
-    return await asyncio.gather(*tasks)
+async def process(data: List[Tuple[int, Tuple[str, str, str]]], storage: Storage, async_func,
+                  threads: int = CHECKER_THREADS_NUM):
+    # Rows sharing a token are checked once, a failed token drops all of them
+    unique: Dict[str, Tuple[int, Tuple[str, str, str]]] = {}
+    for d in data:
+        unique.setdefault(d[1][2], d)
+    queue = asyncio.Queue(maxsize=threads * 2)
+    results = asyncio.Queue()
+    workers = [asyncio.create_task(worker(queue, results, storage, async_func)) for _ in range(threads)]
+    writer = asyncio.create_task(write_results(results, data, len(unique), storage))
+    for d in unique.values():
+        await queue.put(d)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return await writer
 
 
 def main():
+    install_log_sink()
+
     with open('files/wallets.txt', 'r', encoding='utf-8') as file:
         wallets = file.read().splitlines()
         wallets = [w.strip() for w in wallets]
@@ -91,52 +154,25 @@ def main():
         logger.error('Twitter count does not match wallets count')
         return
 
-    def get_batches(threads: int = THREADS_NUM):
-        _data = list(enumerate(list(zip(wallets, proxies, twitters)), start=1))
-        _batches: List[List[Tuple[int, Tuple[str, str, str]]]] = [[] for _ in range(threads)]
-        for _idx, d in enumerate(_data):
-            _batches[_idx % threads].append(d)
-        return _batches
-
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    results = loop.run_until_complete(process(get_batches(), check_account))
-
-    failed_twitter = set()
-    for result in results:
-        for r in result:
-            failed_twitter.add(r[1][2])
-
     storage = Storage('storage/data.json')
     storage.init()
 
-    failed_cnt = 0
+    data = list(enumerate(list(zip(wallets, proxies, twitters)), start=1))
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    failed = loop.run_until_complete(process(data, storage, check_account))
+    loop.close()
 
     print()
 
-    open('results/working_wallets.txt', 'w', encoding='utf-8').close()
-    open('results/working_proxies.txt', 'w', encoding='utf-8').close()
-    open('results/working_twitters.txt', 'w', encoding='utf-8').close()
-    for wallet, proxy, twitter in zip(wallets, proxies, twitters):
-        if twitter in failed_twitter:
-            failed_cnt += 1
-            address = EthAccount().from_key(wallet).address
-            logger.info(f'Removed for address {address} twitter token {twitter}, proxy {proxy}')
-            if CHECKER_UPDATE_STORAGE:
-                storage.remove(address)
-            continue
-        with open('results/working_wallets.txt', 'a', encoding='utf-8') as file:
-            file.write(f'{wallet}\n')
-        with open('results/working_proxies.txt', 'a', encoding='utf-8') as file:
-            file.write(f'{proxy}\n')
-        with open('results/working_twitters.txt', 'a', encoding='utf-8') as file:
-            file.write(f'{twitter}\n')
-
-    logger.info(f'Total failed count: {failed_cnt}')
+    logger.info(f'Total failed count: {len(failed)}')
 
     if CHECKER_UPDATE_STORAGE:
         storage.save()
 
+    stop_recording()
+
     print()
 
 
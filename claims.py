@@ -0,0 +1,129 @@
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from loguru import logger
+from typing import List, Optional, Tuple
+from web3 import Web3
+
+from config import MAX_ETH_GWEI, CLAIMS_PER_GAS_UPDATE, CLAIM_CONCURRENCY
+from gas_oracle import get_gas_oracle
+from metrics import GAS_WAIT
+from tracing import span, clear_trace_account
+from utils import run_with_deadline, deadlines_paused
+
+
+class ClaimScheduler:
+
+    def __init__(self, max_gas_price: int = Web3.to_wei(MAX_ETH_GWEI, 'gwei'),
+                 per_update: int = CLAIMS_PER_GAS_UPDATE, concurrency: int = CLAIM_CONCURRENCY):
+        self.loop = asyncio.get_running_loop()
+        self.oracle = get_gas_oracle()
+        self.max_gas_price = max_gas_price
+        self.per_update = per_update
+        self.concurrency = concurrency
+        self.queue: List[Tuple[int, int, asyncio.Future]] = []
+        self.seq = itertools.count()
+        self.inflight = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for _, _, future in self.queue:
+            future.cancel()
+        self.queue = []
+
+    async def _run(self):
+        clear_trace_account()
+        while True:
+            # One release round per gas oracle update, i.e. per block, while gas is under the limit
+            try:
+                await self.oracle.wait_for_gas_below(self.max_gas_price)
+            except Exception as e:
+                self.fail(e)
+                await asyncio.sleep(self.oracle.poll_interval)
+                continue
+            released = self.release(self.per_update)
+            if released > 0:
+                logger.info(f'Gas window open at {self.oracle.gas_price_gwei} gwei: released {released} claims, '
+                            f'{len(self.queue)} queued, {self.inflight} in flight')
+            async with self.oracle.updated:
+                await self.oracle.updated.wait()
+
+    def release(self, limit: int) -> int:
+        released = 0
+        while len(self.queue) > 0 and released < limit and self.inflight < self.concurrency:
+            _, _, future = heapq.heappop(self.queue)
+            if future.done():
+                continue
+            future.set_result(None)
+            self.inflight += 1
+            released += 1
+        return released
+
+    def return_slot(self):
+        # A slot freed mid-block goes to the next queued claim right away while the gas window is open
+        self.inflight -= 1
+        gas_price = self.oracle.gas_price
+        if not self.oracle.failing and gas_price is not None and gas_price <= self.max_gas_price:
+            self.release(1)
+
+    def fail(self, e: Exception):
+        for _, _, future in self.queue:
+            if not future.done():
+                future.set_exception(e)
+        self.queue = []
+
+    async def wait_turn(self, value: int):
+        future = self.loop.create_future()
+        heapq.heappush(self.queue, (-value, next(self.seq), future))
+        self.start()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.return_slot()
+            raise
+
+    @asynccontextmanager
+    async def claim_slot(self, value: int):
+        # The most valuable queued claims go first. The slot is held until the tx is sent.
+        # Queue time has its own 'claim_queue' deadline instead of the stage and account ones
+        start = time.perf_counter()
+        try:
+            with deadlines_paused(), span('claim_queue', 'wait', value=str(value)):
+                await run_with_deadline('claim_queue', self.wait_turn(value))
+        finally:
+            GAS_WAIT.observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self.return_slot()
+
+
+_claim_scheduler: Optional[ClaimScheduler] = None
+
+
+def get_claim_scheduler() -> ClaimScheduler:
+    global _claim_scheduler
+    if _claim_scheduler is None or _claim_scheduler.loop is not asyncio.get_running_loop():
+        _claim_scheduler = ClaimScheduler()
+    return _claim_scheduler
+
+
+async def stop_claim_scheduler():
+    global _claim_scheduler
+    if _claim_scheduler is not None:
+        await _claim_scheduler.stop()
+        _claim_scheduler = None
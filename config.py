@@ -4,7 +4,31 @@ MAX_TRIES = 2
 
 RPC = 'https://opbnb-mainnet-rpc.bnbchain.org'
 RPC_ETH = 'https://rpc.ankr.com/eth'
+# Coalesce concurrent RPC calls to the same endpoint and proxy into one JSON-RPC batch.
+# Window in seconds, e.g. 0.05. None to disable
+RPC_BATCH_WINDOW = None
+RPC_BATCH_MAX_SIZE = 50
+# Cache chain id, fee data and latest block per endpoint and share identical in-flight requests
+RPC_CACHE = True
+RPC_BLOCK_TIMES = {RPC: 1, RPC_ETH: 12}  # in seconds
 MAX_ETH_GWEI = 2
+# Queue airdrop claims and send the most valuable ones first whenever gas is under MAX_ETH_GWEI,
+# instead of every account waiting for gas on its own. Accounts are also processed by stored airdrop value,
+# unless RANDOM_ORDER is on
+CLAIM_SCHEDULER = False
+CLAIMS_PER_GAS_UPDATE = 10  # claims released per gas oracle update, then one for every slot freed in the block
+CLAIM_CONCURRENCY = 20  # released claims being signed and sent at the same time
+GAS_ORACLE_POLL_INTERVAL = 12  # in seconds
+# Gas waits and fee estimates fail with the last update error when the oracle has no fresh data for this long
+GAS_ORACLE_MAX_AGE = 60  # in seconds
+GAS_ORACLE_HISTORY_BLOCKS = 5
+GAS_ORACLE_PRIORITY_PERCENTILE = 50
+RECEIPT_POLL_INTERVAL = 1  # in seconds
+# Sign transactions in a pool of this many processes. 0 to sign on the event loop
+SIGNING_PROCESSES = 0
+# Send each signed transaction to the main RPC and all its extra endpoints at once. First accepted hash wins
+BROADCAST_TX = False
+BROADCAST_RPCS = {RPC: [], RPC_ETH: []}
 
 CLAIM_HUMAN_PROOF_MODE = True
 
@@ -16,24 +40,78 @@ DISABLE_SSL = False
 UPDATE_STORAGE_ACCOUNT_INFO = False
 
 SKIP_FIRST_ACCOUNTS = 0
-RANDOM_ORDER = True
+RANDOM_ORDER = True  # with CLAIM_SCHEDULER accounts are ordered by airdrop value only when this is off
 RANDOM_BATCH_CNT = None
 MINT_DAILY_NFT_PERCENT = 100
 
 LOOP_RUNS = False
 
+# Deadlines in seconds, None to disable. An account that runs out of time is stored as deferred
+# and retried after all accounts are processed, up to DEFERRED_RETRIES more times
+ACCOUNT_TIMEOUT = 2400
+STAGE_TIMEOUTS = {
+    'sign_in': 300,
+    'profile': 300,
+    'link_wallet': 600,
+    'airdrop': 1800,
+    'airdrop_details': 300,
+    'insights': 600,
+    'claim_queue': 7200,  # time in the claim scheduler queue, not counted in the airdrop and account deadlines
+}
+DEFERRED_RETRIES = 1
+
+# Serve Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics. None to disable
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = None
+# Measure event loop scheduling delay every LOOP_LAG_INTERVAL seconds (gm_loop_lag_seconds). None to disable.
+# When the loop is blocked for longer than LOOP_STALL_THRESHOLD seconds the stack of the blocking code
+# is written to logs/errors.txt
+LOOP_LAG_INTERVAL = 0.1
+LOOP_STALL_THRESHOLD = 0.5
+# Log RSS, live HTTP sessions, event loops and top tracemalloc growth after every main() cycle (see LOOP_RUNS).
+# tracemalloc slows the run down
+MEMORY_SNAPSHOTS = False
+MEMORY_TOP_DIFFS = 10
+# Console logs and multi-line errors for logs/errors.txt are written by one background thread.
+# Messages are dropped when the queue is full. Identical errors within a flush interval are written as one entry
+LOG_QUEUE_SIZE = 10000
+LOG_FLUSH_INTERVAL = 0.2  # in seconds
+LOG_BATCH_SIZE = 1000
+# Append every Well3, Google, Twitter and JSON-RPC exchange to this JSONL file, e.g. 'results/recordings.jsonl'.
+# Recordings contain auth tokens. None to disable
+RECORD_FILE = None
+# Send all HTTP requests to a replay server (python -m benchmarks.replay) instead, e.g. 'http://127.0.0.1:8900'
+REPLAY_URL = None
+# Store per-account stage, HTTP and RPC spans of each run in Chrome trace format (chrome://tracing, Perfetto).
+# Example: 'results/trace.json'. None to disable
+TRACE_FILE = None
+
 AUTO_UPDATE_INVITES = True
 AUTO_UPDATE_INVITES_FROM_FIRST_COUNT = (2, 10)
 
 FAKE_TWITTER = True
 
 DO_TASKS = False
-CLAIM_DAILY_INSIGHT = True
-CLAIM_RANK_INSIGHTS = True
+# Claim insights after linking the wallet. Both claims are sent back-to-back and confirmed together.
+# Off since the insights campaign is over
+CLAIM_DAILY_INSIGHT = False
+CLAIM_RANK_INSIGHTS = False
 
 MIN_INSIGHTS_TO_OPEN = 5
 
 CHECKER_UPDATE_STORAGE = False
+CHECKER_THREADS_NUM = 20  # accounts validated at the same time
+
+# Refresh on-chain insights and claim statuses for all stored accounts with Multicall3 after the run
+MULTICALL_STATUS_REFRESH = False
+MULTICALL_MAX_CALLDATA_SIZE = 64 * 1024  # in bytes per aggregate3 call
+
+# Take insights totals from a local index of insights contract logs instead of per-account questResults calls
+QUEST_RESULTS_INDEX = False
+QUEST_RESULTS_INDEX_FILE = 'storage/quest_results.json'
+# First block to backfill logs from. None to find the insights contract deployment block on the first sync
+QUEST_RESULTS_FROM_BLOCK = None
+QUEST_RESULTS_BLOCK_CHUNK = 5000  # blocks per eth_getLogs request
 
 WELL_ID_MODE = False
 # List of countries for Ring registration. Selects random.
@@ -42,3 +120,12 @@ WELL_ID_MODE = False
 RING_COUNTRIES = []
 
 ONLY_CHECK_AIRDROP = True
+
+# 'default' - process every account as usual
+# 'plan' - read airdrop details and on-chain claim statuses for all accounts and store an action plan in PLAN_FILE.
+#          Only airdrop claims are planned
+# 'execute' - claim only for accounts which have writes in PLAN_FILE
+RUN_MODE = 'default'
+PLAN_FILE = 'results/plan.json'
+PLAN_THREADS_NUM = 20
+EXECUTE_THREADS_NUM = THREADS_NUM
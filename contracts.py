@@ -0,0 +1,76 @@
+from eth_abi import encode, decode
+from eth_utils import keccak, to_bytes
+from typing import Any, Dict, List, Optional
+
+from vars import INSIGHTS_CONTRACT_ADDRESS, INSIGHTS_CONTRACT_ABI, CLAIM_HUMAN_PROOF_ADDRESS, CLAIM_HUMAN_PROOF_ABI, \
+    MULTICALL3_ADDRESS, MULTICALL3_ABI, MINT_CONTRACT_ADDRESS
+
+
+def _collapse_type(param: dict) -> str:
+    if param['type'].startswith('tuple'):
+        return '(' + ','.join(_collapse_type(c) for c in param['components']) + ')' + param['type'][5:]
+    return param['type']
+
+
+class FunctionCodec:
+
+    def __init__(self, name: str, input_types: List[str], output_types: List[str], selector: Optional[str] = None):
+        self.name = name
+        self.input_types = input_types
+        self.output_types = output_types
+        if selector is None:
+            self.selector = keccak(text=f'{name}({",".join(input_types)})')[:4]
+        else:
+            self.selector = to_bytes(hexstr=selector)
+
+    @classmethod
+    def from_abi(cls, abi: dict) -> "FunctionCodec":
+        return cls(abi['name'], [_collapse_type(i) for i in abi['inputs']],
+                   [_collapse_type(o) for o in abi.get('outputs', [])])
+
+    def encode(self, *args) -> bytes:
+        return self.selector + encode(self.input_types, args)
+
+    def decode(self, data: bytes) -> Any:
+        values = decode(self.output_types, data)
+        return values[0] if len(values) == 1 else list(values)
+
+
+class ContractCall:
+    __slots__ = ('address', 'data', 'codec')
+
+    def __init__(self, address: str, data: bytes, codec: FunctionCodec):
+        self.address = address
+        self.data = data
+        self.codec = codec
+
+    def to_tx(self) -> dict:
+        return {'to': self.address, 'data': self.data}
+
+    async def call(self, w3) -> Any:
+        return self.codec.decode(await w3.eth.call(self.to_tx()))
+
+
+class ContractCodec:
+
+    def __init__(self, address: str, abi: List[dict] = None, functions: List[FunctionCodec] = None):
+        self.address = address
+        self.functions: Dict[str, FunctionCodec] = {}
+        for entry in abi or []:
+            if entry.get('type') == 'function':
+                self.functions[entry['name']] = FunctionCodec.from_abi(entry)
+        for codec in functions or []:
+            self.functions[codec.name] = codec
+
+    def __getattr__(self, name: str):
+        functions = self.__dict__.get('functions', {})
+        if name not in functions:
+            raise AttributeError(f'Unknown contract function: {name}')
+        codec = functions[name]
+        return lambda *args: ContractCall(self.address, codec.encode(*args), codec)
+
+
+INSIGHTS = ContractCodec(INSIGHTS_CONTRACT_ADDRESS, INSIGHTS_CONTRACT_ABI)
+CLAIM_HUMAN_PROOF = ContractCodec(CLAIM_HUMAN_PROOF_ADDRESS, CLAIM_HUMAN_PROOF_ABI)
+MULTICALL3 = ContractCodec(MULTICALL3_ADDRESS, MULTICALL3_ABI)
+MINT = ContractCodec(MINT_CONTRACT_ADDRESS, functions=[FunctionCodec('mint', ['string'], [], selector='0x1f54b30a')])
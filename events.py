@@ -0,0 +1,139 @@
+import os
+import json
+from loguru import logger
+from typing import Dict, List, Optional, Tuple
+from web3 import AsyncWeb3
+
+from config import QUEST_RESULTS_INDEX_FILE, QUEST_RESULTS_FROM_BLOCK, QUEST_RESULTS_BLOCK_CHUNK, RPC_BATCH_MAX_SIZE
+from vars import INSIGHTS_CONTRACT_ADDRESS, LOG_RESULT_TOPIC, LOG_CLAIM_MYTHICAL_TOPIC
+from storage import Storage
+from utils import get_w3, close_w3, rpc_batch
+
+
+INSIGHT_NAMES = ['uncommon', 'rare', 'legendary', 'mythical']
+
+
+def _hex(value) -> str:
+    if type(value) is str:
+        return value.lower()
+    return '0x' + bytes(value).hex()
+
+
+def decode_insight_logs(logs) -> List[Tuple[str, List[int]]]:
+    # Plain loop over logs: each one is a few fixed 32-byte words sliced out of data
+    decoded = []
+    for log in logs:
+        topics = [_hex(t) for t in log.get('topics') or []]
+        if len(topics) < 2 or log.get('data') is None:
+            continue
+        data = bytes.fromhex(_hex(log['data'])[2:])
+        address = '0x' + topics[1][-40:]
+        if topics[0] == LOG_RESULT_TOPIC:
+            decoded.append((address, [int.from_bytes(data[i:i + 32], 'big') for i in range(64, 192, 32)]))
+        elif topics[0] == LOG_CLAIM_MYTHICAL_TOPIC:
+            decoded.append((address, [0, 0, 0, int.from_bytes(data[:32], 'big')]))
+    return decoded
+
+
+async def find_deployment_block(w3: AsyncWeb3, address: str, latest: int) -> int:
+    # Binary search over eth_getCode, so the RPC has to serve historical state
+    low, high = 0, latest
+    if len(await w3.eth.get_code(address, high)) == 0:
+        raise Exception(f'No contract code at {address}')
+    while low < high:
+        middle = (low + high) // 2
+        if len(await w3.eth.get_code(address, middle)) > 0:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+class QuestResultIndex:
+
+    def __init__(self, filename: str = QUEST_RESULTS_INDEX_FILE):
+        self.filename = filename
+        self.last_block: Optional[int] = None if QUEST_RESULTS_FROM_BLOCK is None else QUEST_RESULTS_FROM_BLOCK - 1
+        self.totals: Dict[str, List[int]] = {}
+
+    def init(self):
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        self.last_block = data['last_block']
+        self.totals = data['totals']
+
+    def save(self):
+        with open(self.filename, 'w', encoding='utf-8') as file:
+            json.dump({'last_block': self.last_block, 'totals': self.totals}, file)
+
+    def add_logs(self, logs):
+        for address, values in decode_insight_logs(logs):
+            total = self.totals.setdefault(address, [0, 0, 0, 0])
+            for i, value in enumerate(values):
+                total[i] += value
+
+    def get_insights(self, address: str) -> Dict[str, int]:
+        return dict(zip(INSIGHT_NAMES, self.totals.get(address.lower(), [0, 0, 0, 0])))
+
+    async def _get_logs(self, w3: AsyncWeb3, ranges: List[Tuple[int, int]]) -> List[dict]:
+        try:
+            results = await rpc_batch(w3, [('eth_getLogs', [{
+                'address': INSIGHTS_CONTRACT_ADDRESS,
+                'topics': [[LOG_RESULT_TOPIC, LOG_CLAIM_MYTHICAL_TOPIC]],
+                'fromBlock': hex(from_block),
+                'toBlock': hex(to_block),
+            }]) for from_block, to_block in ranges])
+            return [log for logs in results for log in logs]
+        except Exception:
+            if len(ranges) > 1 or ranges[0][0] == ranges[0][1]:
+                raise
+            from_block, to_block = ranges[0]
+            middle = (from_block + to_block) // 2
+            return await self._get_logs(w3, [(from_block, middle)]) + \
+                await self._get_logs(w3, [(middle + 1, to_block)])
+
+    async def sync(self, w3: AsyncWeb3, chunk_size: int = QUEST_RESULTS_BLOCK_CHUNK):
+        latest = await w3.eth.block_number
+        if self.last_block is None:
+            try:
+                self.last_block = await find_deployment_block(w3, INSIGHTS_CONTRACT_ADDRESS, latest) - 1
+            except Exception as e:
+                raise Exception(f'Failed to find insights contract deployment block, '
+                                f'set QUEST_RESULTS_FROM_BLOCK: {str(e)}')
+            logger.info(f'Insights contract deployed at block {self.last_block + 1}')
+        start_block = self.last_block + 1
+        while self.last_block < latest:
+            ranges = []
+            from_block = self.last_block + 1
+            while from_block <= latest and len(ranges) < RPC_BATCH_MAX_SIZE:
+                ranges.append((from_block, min(from_block + chunk_size - 1, latest)))
+                from_block += chunk_size
+            try:
+                logs = await self._get_logs(w3, ranges)
+            except Exception:
+                if len(ranges) == 1:
+                    raise
+                logs = []
+                for r in ranges:
+                    logs.extend(await self._get_logs(w3, [r]))
+            self.add_logs(logs)
+            self.last_block = ranges[-1][1]
+            self.save()
+        logger.info(f'Quest results index synced blocks {start_block}-{self.last_block}: '
+                    f'{len(self.totals)} addresses')
+
+
+async def update_insights_from_index(storage: Storage):
+    index = QuestResultIndex()
+    index.init()
+    w3 = get_w3()
+    try:
+        await index.sync(w3)
+    finally:
+        await close_w3(w3)
+    for address in list(storage.data):
+        info = storage.get_final_account_info(address)
+        info.insights = index.get_insights(address)
+        storage.set_final_account_info(address, info)
@@ -0,0 +1,116 @@
+import random
+import asyncio
+from loguru import logger
+from typing import Optional, Tuple
+
+from config import RPC_ETH, GAS_ORACLE_POLL_INTERVAL, GAS_ORACLE_HISTORY_BLOCKS, GAS_ORACLE_PRIORITY_PERCENTILE, \
+    GAS_ORACLE_MAX_AGE
+from utils import get_w3, close_w3
+from tracing import clear_trace_account
+
+
+class GasOracle:
+
+    def __init__(self, rpc: str = RPC_ETH, poll_interval: float = GAS_ORACLE_POLL_INTERVAL,
+                 max_age: float = GAS_ORACLE_MAX_AGE):
+        self.w3 = get_w3(rpc=rpc)
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.loop = asyncio.get_running_loop()
+        self.base_fee: Optional[int] = None
+        self.priority_fee: Optional[int] = None
+        self.updated_at = self.loop.time()
+        self.error: Optional[Exception] = None
+        self.waiters = 0
+        self.updated = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def gas_price(self) -> Optional[int]:
+        if self.base_fee is None:
+            return None
+        return self.base_fee + self.priority_fee
+
+    @property
+    def gas_price_gwei(self) -> float:
+        return round((self.gas_price or 0) / 10 ** 9, 2)
+
+    @property
+    def failing(self) -> bool:
+        return self.error is not None and self.loop.time() - self.updated_at > self.max_age
+
+    def start(self):
+        if self.task is None:
+            self.task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await close_w3(self.w3)
+
+    async def _run(self):
+        clear_trace_account()
+        while True:
+            try:
+                await self.update()
+            except Exception as e:
+                logger.warning(f'Gas oracle update failed: {str(e)}')
+                async with self.updated:
+                    self.error = e
+                    self.updated.notify_all()
+            await asyncio.sleep(self.poll_interval)
+
+    async def update(self):
+        history = await self.w3.eth.fee_history(GAS_ORACLE_HISTORY_BLOCKS, 'latest', [GAS_ORACLE_PRIORITY_PERCENTILE])
+        rewards = sorted(r[0] for r in history['reward'] if len(r) > 0)
+        async with self.updated:
+            self.base_fee = history['baseFeePerGas'][-1]
+            self.priority_fee = rewards[len(rewards) // 2] if len(rewards) > 0 else 0
+            self.updated_at = self.loop.time()
+            self.error = None
+            if self.waiters > 0:
+                logger.info(f'Gas oracle: {self.gas_price_gwei} gwei, {self.waiters} accounts waiting')
+            self.updated.notify_all()
+
+    async def wait_for_gas_below(self, max_gas_price: int, timeout: Optional[float] = None):
+        self.start()
+        async with self.updated:
+            self.waiters += 1
+            try:
+                await asyncio.wait_for(self.updated.wait_for(
+                    lambda: self.failing or (self.gas_price is not None and self.gas_price <= max_gas_price)
+                ), timeout)
+            finally:
+                self.waiters -= 1
+            if self.failing:
+                raise Exception(f'Gas oracle has no data for {self.max_age}s: {str(self.error)}')
+
+    async def estimate_fees(self) -> Tuple[int, int]:
+        try:
+            await self.wait_for_gas_below(2 ** 256, timeout=self.max_age)
+        except asyncio.TimeoutError:
+            raise Exception(f'Gas oracle has no data for {self.max_age}s: {str(self.error)}')
+        max_fee_per_gas = int(self.base_fee * random.uniform(1.1, 1.3)) + self.priority_fee
+        return self.priority_fee, max_fee_per_gas
+
+
+_gas_oracle: Optional[GasOracle] = None
+
+
+def get_gas_oracle() -> GasOracle:
+    global _gas_oracle
+    if _gas_oracle is None or _gas_oracle.loop is not asyncio.get_running_loop():
+        _gas_oracle = GasOracle()
+    return _gas_oracle
+
+
+async def stop_gas_oracle():
+    global _gas_oracle
+    if _gas_oracle is not None:
+        await _gas_oracle.stop()
+        _gas_oracle = None
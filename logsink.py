@@ -0,0 +1,125 @@
+import sys
+import time
+import queue
+import atexit
+import threading
+from loguru import logger
+from loguru._defaults import LOGURU_FORMAT
+from datetime import datetime
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from config import LOG_QUEUE_SIZE, LOG_FLUSH_INTERVAL, LOG_BATCH_SIZE
+
+
+ERRORS_FILE = 'logs/errors.txt'
+
+
+class LogSink:
+
+    def __init__(self, stream: TextIO = None, errors_filename: str = ERRORS_FILE,
+                 maxsize: int = LOG_QUEUE_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL,
+                 batch_size: int = LOG_BATCH_SIZE):
+        self.stream = sys.stderr if stream is None else stream
+        self.errors_filename = errors_filename
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.written = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Called from the event loop and the loop monitor threads
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def write_console(self, message: str):
+        self._put(('console', message))
+
+    def write_error(self, idx, msg: str, e_msg: str):
+        self._put(('error', (str(datetime.now()), idx, msg, e_msg)))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            items = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size and items[-1] is not None:
+                timeout = deadline - time.monotonic()
+                try:
+                    items.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                stop = True
+                items.pop()
+            try:
+                self._write(items)
+            except Exception as e:
+                print(f'Log sink write error: {str(e)}', file=sys.stderr)
+
+    def _write(self, items: List[Tuple[str, object]]):
+        console = []
+        errors: Dict[Tuple[str, str], List] = {}
+        for kind, value in items:
+            if kind == 'console':
+                console.append(value)
+                continue
+            ts, idx, msg, e_msg = value
+            entry = errors.get((msg, e_msg))
+            if entry is None:
+                errors[(msg, e_msg)] = [ts, [idx]]
+            else:
+                entry[1].append(idx)
+        with self.dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped > 0:
+            console.append(f'{str(datetime.now())} | Log queue is full: {dropped} messages dropped\n')
+        if len(console) > 0:
+            self.stream.write(''.join(console))
+            self.stream.flush()
+        if len(errors) > 0:
+            with open(self.errors_filename, 'a', encoding='utf-8') as file:
+                for (msg, e_msg), (ts, idxs) in errors.items():
+                    if len(idxs) == 1:
+                        file.write(f'{ts} | {idxs[0]}) {msg}: {e_msg}\n')
+                    else:
+                        file.write(f'{ts} | {", ".join(str(i) for i in idxs)}) {msg} (x{len(idxs)}): {e_msg}\n')
+        self.written += len(items)
+
+
+_log_sink: Optional[LogSink] = None
+_handler_id: Optional[int] = None
+
+
+def get_log_sink() -> LogSink:
+    global _log_sink
+    if _log_sink is None:
+        _log_sink = LogSink()
+        _log_sink.start()
+        atexit.register(_log_sink.stop)
+    return _log_sink
+
+
+def install_log_sink():
+    global _handler_id
+    if _handler_id is not None:
+        return
+    logger.remove()
+    _handler_id = logger.add(get_log_sink().write_console, format=LOGURU_FORMAT,
+                             colorize=sys.stderr.isatty())
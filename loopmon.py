@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import Counter
+from loguru import logger
+from typing import Optional
+
+from config import LOOP_LAG_INTERVAL, LOOP_STALL_THRESHOLD
+from metrics import LOOP_LAG, LOOP_STALLS
+from logsink import get_log_sink
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _blocking_location(stack: traceback.StackSummary) -> str:
+    # Innermost frame of our own code, so stalls inside libraries point at the call that made them
+    for frame in reversed(stack):
+        if frame.filename.startswith(ROOT) and 'site-packages' not in frame.filename:
+            return f'{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} {frame.name}'
+    frame = stack[-1]
+    return f'{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}'
+
+
+class LoopMonitor:
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: Optional[float] = LOOP_STALL_THRESHOLD):
+        self.loop = asyncio.get_running_loop()
+        self.interval = interval
+        self.threshold = threshold
+        self.thread_id = threading.get_ident()
+        self.beat = time.perf_counter()
+        self.paused = False
+        self.stall_location: Optional[str] = None
+        self.stalls = Counter()
+        self.max_lag = 0.0
+        self.stopped = threading.Event()
+        self.task = self.loop.create_task(self._run())
+        self.watchdog: Optional[threading.Thread] = None
+        if threshold is not None:
+            self.watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self.watchdog.start()
+
+    async def _run(self):
+        while True:
+            st = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(now - st - self.interval, 0)
+            self.beat = now
+            if self.paused:
+                # Loop was not running between run_until_complete calls
+                self.paused = False
+                self.stall_location = None
+                continue
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self.stall_location is not None:
+                logger.warning(f'Event loop was blocked for {lag:.2f}s at {self.stall_location}')
+                self.stall_location = None
+
+    def _watch(self):
+        while not self.stopped.wait(self.threshold / 2):
+            if not self.loop.is_running():
+                self.paused = True
+                continue
+            if self.stall_location is not None or time.perf_counter() - self.beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or not self.loop.is_running():
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            location = _blocking_location(stack)
+            self.stall_location = location
+            self.stalls[location] += 1
+            LOOP_STALLS.inc(location=location)
+            get_log_sink().write_error('loop', f'Event loop blocked for over {self.threshold}s at {location}',
+                                       '\n' + ''.join(traceback.format_list(stack)))
+
+    async def stop(self):
+        self.stopped.set()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        if self.watchdog is not None:
+            self.watchdog.join()
+        if len(self.stalls) > 0:
+            top = ', '.join(f'{location} x{cnt}' for location, cnt in self.stalls.most_common(5))
+            logger.warning(f'Event loop stalls: {sum(self.stalls.values())}, max lag {self.max_lag:.2f}s. '
+                           f'Top blocking code: {top}')
+
+
+_loop_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    global _loop_monitor
+    if LOOP_LAG_INTERVAL is None:
+        return None
+    if _loop_monitor is None or _loop_monitor.loop is not asyncio.get_running_loop():
+        _loop_monitor = LoopMonitor()
+    return _loop_monitor
+
+
+async def stop_loop_monitor():
+    global _loop_monitor
+    if _loop_monitor is not None:
+        await _loop_monitor.stop()
+        _loop_monitor = None
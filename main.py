@@ -1,8 +1,8 @@
 import csv
 import time
 import random
-import aiohttp
 import asyncio
+import argparse
 
 from termcolor import cprint
 from loguru import logger
@@ -10,17 +10,34 @@ from datetime import datetime
 from typing import Tuple, List, Optional
 from eth_account import Account as EthAccount
 
-from async_web3 import close_all_sessions
+from async_web3 import close_all_sessions, clear_rpc_cache
 from storage import Storage
 from models import AccountInfo, ProcessResult
 from twitter import Twitter
 from well3 import Well3
 from account import Account
+from multicall import read_fleet_status
+from gas_oracle import stop_gas_oracle
+from planner import Planner, save_plan, load_plan
+from events import update_insights_from_index
+from receipts import stop_receipt_trackers
+from broadcast import stop_tx_broadcaster
+from claims import stop_claim_scheduler
+from signer import shutdown_signing_service
+from metrics import ACCOUNTS, ACCOUNTS_IN_PROGRESS, get_stage, set_stage, fail_stage, start_metrics_server
+from tracing import span, traced, set_trace_account, start_tracing, save_trace
+from logsink import install_log_sink
+from loopmon import get_loop_monitor, stop_loop_monitor
+from profiler import start_cpu_profiler, stop_cpu_profiler
+from memtrack import start_memory_tracking, memory_checkpoint
+from transport import create_session, stop_recording
 from config import DO_TASKS, CLAIM_DAILY_INSIGHT, CLAIM_RANK_INSIGHTS, \
     WAIT_BETWEEN_ACCOUNTS, THREADS_NUM, AUTO_UPDATE_INVITES, AUTO_UPDATE_INVITES_FROM_FIRST_COUNT, \
     SKIP_FIRST_ACCOUNTS, MOBILE_PROXY, RANDOM_ORDER, UPDATE_STORAGE_ACCOUNT_INFO, LOOP_RUNS, RANDOM_BATCH_CNT, \
-    RING_COUNTRIES, WELL_ID_MODE, CLAIM_HUMAN_PROOF_MODE
-from utils import wait_a_bit, async_retry, log_long_exc
+    RING_COUNTRIES, WELL_ID_MODE, CLAIM_HUMAN_PROOF_MODE, MULTICALL_STATUS_REFRESH, ONLY_CHECK_AIRDROP, \
+    RUN_MODE, PLAN_THREADS_NUM, EXECUTE_THREADS_NUM, QUEST_RESULTS_INDEX, ACCOUNT_TIMEOUT, DEFERRED_RETRIES, \
+    CLAIM_SCHEDULER
+from utils import wait_a_bit, async_retry, log_long_exc, run_with_deadline, DeadlineExceeded
 
 
 class InvitesHandler:
@@ -86,9 +103,10 @@ class InvitesHandler:
             raise Exception(f'Update invites failed: {str(e)}')
 
 
+@traced()
 @async_retry
 async def change_ip(idx, link: str):
-    async with aiohttp.ClientSession() as sess:
+    async with create_session() as sess:
         async with sess.get(link) as resp:
             if resp.status != 200:
                 raise Exception(f'Failed to change ip: Status = {resp.status}. Response = {await resp.text()}')
@@ -127,14 +145,54 @@ claim_error_ids = []
 claim_error_lock = asyncio.Lock()
 
 
-async def process_account(account_data, storage: Storage, invites: InvitesHandler) \
-        -> ProcessResult:
+async def plan_account(account_data, storage: Storage, planner: Planner) -> ProcessResult:
+    idx, (wallet, proxy, twitter_token, _, _) = account_data
+    address = EthAccount().from_key(wallet).address
+    logger.info(f'{idx}) Planning {address}')
+
+    set_stage('restore')
+    account_info = await storage.get_account_info(address)
+    if account_info is None:
+        account_info = AccountInfo(address=address, proxy=proxy, twitter_auth_token=twitter_token)
+    account_info.deferred_stage = ''
+
+    if '|' in account_info.proxy:
+        change_link = account_info.proxy.split('|')[1]
+        await change_ip(idx, change_link)
+
+    set_stage('sign_in')
+    twitter = Twitter(account_info)
+    well3 = Well3(idx, account_info, twitter)
+    if await run_with_deadline('sign_in', well3.sign_in_or_start_register_if_needed()):
+        raise Exception('Registering is not available')
+
+    set_stage('airdrop_details')
+    details = await run_with_deadline('airdrop_details', well3.get_airdrop_details())
+    if type(details) is dict and details.get('error') == 'Not Found':
+        account_info.airdrop = 0
+        planner.add(idx, address)
+    else:
+        account_info.airdrop = int(details[1])
+        account_info.airdrop_sig = details[0]
+        planner.add(idx, address, details[0])
+
+    await storage.set_account_info(address, account_info)
+    return ProcessResult()
+
+
+async def execute_account(account_data, storage: Storage, invites: InvitesHandler) -> ProcessResult:
+    return await process_account(account_data, storage, invites, only_check_airdrop=False)
+
+
+async def process_account(account_data, storage: Storage, invites: InvitesHandler,
+                          only_check_airdrop: bool = ONLY_CHECK_AIRDROP) -> ProcessResult:
     result = ProcessResult()
 
     idx, (wallet, proxy, twitter_token, prompt, bybit) = account_data
     address = EthAccount().from_key(wallet).address
     logger.info(f'{idx}) Processing {address}')
 
+    set_stage('restore')
     account_info = await storage.get_account_info(address)
     if account_info is None:
         logger.info(f'{idx}) Account info was not saved before')
@@ -145,6 +203,7 @@ async def process_account(account_data, storage: Storage, invites: InvitesHandle
             #account_info.twitter_auth_token = twitter_token
         logger.info(f'{idx}) Saved account info restored')
     account_info.mint_prompt = prompt
+    account_info.deferred_stage = ''
     account_info.bybit_id = bybit
 
     if '|' in account_info.proxy:
@@ -157,8 +216,9 @@ async def process_account(account_data, storage: Storage, invites: InvitesHandle
     well3 = Well3(idx, account_info, twitter)
 
     logger.info(f'{idx}) Signing in')
+    set_stage('sign_in')
 
-    need_invite = await well3.sign_in_or_start_register_if_needed()
+    need_invite = await run_with_deadline('sign_in', well3.sign_in_or_start_register_if_needed())
     if need_invite:
         raise Exception('Registering is not available')
         while True:
@@ -183,12 +243,24 @@ async def process_account(account_data, storage: Storage, invites: InvitesHandle
     logger.info(f'{idx}) Signed in')
 
     async with Account(idx, account_info, well3, twitter) as account:
-        await account.refresh_profile()
-        await account.link_wallet_if_needed(wallet)
-        await account.claim_airdrop()
+        set_stage('profile')
+        await run_with_deadline('profile', account.refresh_profile())
+        set_stage('link_wallet')
+        await run_with_deadline('link_wallet', account.link_wallet_if_needed(wallet))
+        if CLAIM_DAILY_INSIGHT or CLAIM_RANK_INSIGHTS:
+            set_stage('insights')
+            await run_with_deadline('insights', account.claim_insights())
+        set_stage('airdrop')
+        try:
+            await run_with_deadline('airdrop', account.claim_airdrop(only_check_airdrop))
+        finally:
+            if account_info.airdrop_claim_tx != '':
+                # Saved right away, so the next run checks the sent claim instead of sending another one
+                await storage.set_account_info(address, account_info)
 
     logger.info(f'{idx}) Account stats:\n{account_info.str_stats()}')
 
+    set_stage('save')
     await storage.set_account_info(address, account_info)
 
     await storage.async_save()
@@ -196,33 +268,86 @@ async def process_account(account_data, storage: Storage, invites: InvitesHandle
     return result
 
 
-async def process_batch(bid: int, batch, storage: Storage, invites: InvitesHandler,
-                        async_func, sleep):
-    await asyncio.sleep(WAIT_BETWEEN_ACCOUNTS[0] / THREADS_NUM * bid)
-    failed, used_invites = [], 0
+async def defer_account(account_data, storage: Storage, stage: str) -> bool:
+    idx, (wallet, proxy, twitter_token, _, _) = account_data
+    address = EthAccount().from_key(wallet).address
+    account_info = await storage.get_account_info(address)
+    if account_info is None:
+        account_info = AccountInfo(address=address, proxy=proxy, twitter_auth_token=twitter_token)
+    account_info.deferred_stage = stage
+    await storage.set_account_info(address, account_info)
+    # A claim tx that is already sent is left to the next run, a retry in this run would race it
+    return account_info.airdrop_claim_tx == ''
+
+
+async def process_batch(bid: int, batch, storage: Storage, context, async_func, sleep,
+                        threads: int = THREADS_NUM, wait: Tuple[float, float] = WAIT_BETWEEN_ACCOUNTS):
+    if sleep:
+        await asyncio.sleep(wait[0] / threads * bid)
+    failed, used_invites, deferred = [], 0, []
     for idx, d in enumerate(batch):
         if sleep and idx != 0:
-            await asyncio.sleep(random.uniform(WAIT_BETWEEN_ACCOUNTS[0], WAIT_BETWEEN_ACCOUNTS[1]))
+            await asyncio.sleep(random.uniform(wait[0], wait[1]))
+        ACCOUNTS_IN_PROGRESS.inc()
+        set_trace_account(d[0])
         try:
-            result = await async_func(d, storage, invites)
+            with span('account', 'account'):
+                result = await run_with_deadline('account', async_func(d, storage, context), ACCOUNT_TIMEOUT)
             if result.invite_used:
                 used_invites += 1
+            set_stage('')
+            ACCOUNTS.inc(status='ok')
+        except DeadlineExceeded as e:
+            stage = get_stage() or e.stage
+            if await defer_account(d, storage, stage):
+                fail_stage('deferred')
+                ACCOUNTS.inc(status='deferred')
+                deferred.append(d)
+                logger.warning(f'{d[0]}) {str(e)} in {stage} stage. Account is deferred')
+            else:
+                fail_stage()
+                ACCOUNTS.inc(status='failed')
+                failed.append(d)
+                logger.warning(f'{d[0]}) {str(e)} in {stage} stage. Claim tx is sent, it is checked on next run')
         except Exception as e:
+            fail_stage()
+            ACCOUNTS.inc(status='failed')
             failed.append(d)
             await log_long_exc(d[0], 'Process account error', e)
+        finally:
+            ACCOUNTS_IN_PROGRESS.dec()
 
-    return failed, used_invites
+    return failed, used_invites, deferred
 
 
-async def process(batches, storage: Storage, invites: InvitesHandler,
-                  async_func, sleep=True):
+async def process(batches, storage: Storage, context, async_func, sleep=True,
+                  wait: Tuple[float, float] = WAIT_BETWEEN_ACCOUNTS):
+    # context is passed to async_func as is: InvitesHandler for processing, Planner for planning
+    get_loop_monitor()
     tasks = []
     for idx, b in enumerate(batches):
-        tasks.append(asyncio.create_task(process_batch(idx, b, storage, invites, async_func, sleep)))
-    return await asyncio.gather(*tasks)
+        tasks.append(asyncio.create_task(process_batch(idx, b, storage, context, async_func, sleep,
+                                                       len(batches), wait)))
+    results = await asyncio.gather(*tasks)
+    for _ in range(DEFERRED_RETRIES):
+        deferred = [d for r in results for d in r[2]]
+        if len(deferred) == 0:
+            break
+        for r in results:
+            r[2].clear()
+        logger.info(f'Retrying {len(deferred)} deferred accounts')
+        threads = min(len(batches), len(deferred))
+        results.extend(await asyncio.gather(*[
+            process_batch(idx, deferred[idx::threads], storage, context, async_func, sleep, threads, wait)
+            for idx in range(threads)
+        ]))
+    return results
+
 
+def main(threads_num: int = THREADS_NUM, wait: Tuple[float, float] = WAIT_BETWEEN_ACCOUNTS):
+    install_log_sink()
+    claim_error_ids.clear()
 
-def main():
     with open('files/wallets.txt', 'r', encoding='utf-8') as file:
         wallets = file.read().splitlines()
         wallets = [w.strip() for w in wallets]
@@ -269,6 +394,9 @@ def main():
     storage = Storage('storage/data.json')
     storage.init()
 
+    start_metrics_server()
+    start_tracing()
+
     addresses = []
     for idx, w in enumerate(wallets, start=1):
         try:
@@ -280,7 +408,7 @@ def main():
 
     want_only = []
 
-    def get_batches(skip: int = None, threads: int = THREADS_NUM):
+    def get_batches(skip: int = None, threads: int = threads_num):
         _data = list(enumerate(list(zip(wallets, proxies, twitters, prompts, bybits)), start=1))
         if skip is not None:
             _data = _data[skip:]
@@ -291,6 +419,12 @@ def main():
             random.shuffle(_data)
         if RANDOM_BATCH_CNT:
             _data = _data[:RANDOM_BATCH_CNT]
+        if CLAIM_SCHEDULER and not RANDOM_ORDER and (RUN_MODE == 'execute' or not ONLY_CHECK_AIRDROP):
+            # Most valuable unclaimed airdrops are queued first for the cheap gas windows.
+            # Skipped with RANDOM_ORDER, the shuffle is kept
+            airdrops = [0 if info is None or info.airdrop_claimed else info.airdrop
+                        for _, info in storage.iter_account_infos(addresses)]
+            _data.sort(key=lambda d: -airdrops[d[0] - 1])
         _batches: List[List[Tuple[int, Tuple[str, str, str, str, str]]]] = [[] for _ in range(threads)]
         for _idx, d in enumerate(_data):
             _batches[_idx % threads].append(d)
@@ -298,13 +432,30 @@ def main():
 
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    results = loop.run_until_complete(process(
-        get_batches(SKIP_FIRST_ACCOUNTS),
-        storage, invites_handler, process_account
-    ))
+    if RUN_MODE == 'plan':
+        planner = Planner(storage)
+        batches = get_batches(SKIP_FIRST_ACCOUNTS, threads=PLAN_THREADS_NUM)
+        results = loop.run_until_complete(process(batches, storage, planner, plan_account, sleep=False))
+        save_plan(loop.run_until_complete(planner.build()))
+    elif RUN_MODE == 'execute':
+        plan = load_plan()
+        for p in plan:
+            if len(p['actions']) == 0:
+                continue
+            if p['idx'] > len(addresses) or addresses[p['idx'] - 1] != p['address']:
+                logger.error(f'Plan does not match wallets: #{p["idx"]} {p["address"]}')
+                return
+            want_only.append(p['idx'])
+        logger.info(f'Executing plan for {len(want_only)} accounts')
+        batches = get_batches(SKIP_FIRST_ACCOUNTS, threads=EXECUTE_THREADS_NUM) if len(want_only) > 0 else []
+        results = loop.run_until_complete(process(batches, storage, invites_handler, execute_account, wait=wait))
+    else:
+        batches = get_batches(SKIP_FIRST_ACCOUNTS)
+        results = loop.run_until_complete(process(batches, storage, invites_handler, process_account, wait=wait))
 
     failed = [r[0] for r in results]
     failed = [f[0] for fs in failed for f in fs]
+    deferred = [d[0] for r in results for d in r[2]]
     used_invites = [r[1] for r in results]
 
     used_invites = sum(used_invites)
@@ -314,107 +465,89 @@ def main():
     print()
     logger.info('Finished')
     logger.info(f'Failed ids: {failed}')
+    if len(deferred) > 0:
+        logger.warning(f'Deferred ids: {deferred}')
     print()
 
     logger.info(f'Claim error: {[i for i in claim_error_ids]}')
     print()
 
+    if MULTICALL_STATUS_REFRESH:
+        # Only profiles read in this run have today's daily quest nonce
+        refreshed = set() if RUN_MODE == 'plan' else \
+            {d[0] for b in batches for d in b} - set(failed) - set(deferred)
+        daily_nonces = {address: info.daily_quest_nonce
+                        for idx, (address, info) in enumerate(storage.iter_account_infos(addresses), start=1)
+                        if idx in refreshed and info is not None and info.daily_quest_nonce != ''}
+        try:
+            loop.run_until_complete(read_fleet_status(storage, addresses, daily_nonces=daily_nonces))
+            storage.save()
+        except Exception as e:
+            logger.error(f'Fleet status refresh failed: {str(e)}')
+
+    if QUEST_RESULTS_INDEX:
+        try:
+            loop.run_until_complete(update_insights_from_index(storage))
+            storage.save()
+        except Exception as e:
+            logger.error(f'Quest results index sync failed: {str(e)}')
+
+    loop.run_until_complete(stop_claim_scheduler())
+    loop.run_until_complete(stop_gas_oracle())
+    loop.run_until_complete(stop_receipt_trackers())
+    loop.run_until_complete(stop_tx_broadcaster())
     loop.run_until_complete(close_all_sessions())
+    loop.run_until_complete(stop_loop_monitor())
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+    clear_rpc_cache()
+    shutdown_signing_service()
+    save_trace()
+    stop_recording()
 
     logger.info(f'Used invites: {used_invites}')
 
-    csv_data = [['#', 'Address', 'Airdrop', 'Airdrop Claimed', 'Human Proof', 'Bybit ID', 'Well ID', 'Ring Registered',
-                 'Total', 'Uncommon', 'Rare', 'Legendary', 'Mythical',
-                 'Daily insight', 'Insights to open', 'Pending quests', 'Daily mint', 'Next breathe',
-                 'Invite codes', 'Exp', 'Lvl']]
-    total = {
-        'total': 0,
-        'uncommon': 0,
-        'rare': 0,
-        'legendary': 0,
-        'mythical': 0,
-        'daily_claimed': 0,
-        'daily_available': 0,
-        'daily_minted': 0,
-        'to_open': 0,
-        'pending': 0,
-        'breathe': 0,
-        'well_id': 0,
-        'ring_registered': 0,
-        'human_proof': 0,
-        'bybit_id': 0,
-        'airdrop': 0,
-        'airdrop_claimed': 0,
-    }
-    all_invite_codes = []
-    daily_available_acc_ids = []
-    daily_mint_not_done_ids = []
-    for idx, w in enumerate(wallets, start=1):
-        address = EthAccount().from_key(w).address
-
-        account = storage.get_final_account_info(address)
-        if account is None:
-            csv_data.append([idx, address])
-            continue
-
-        all_invite_codes.extend(account.invite_codes)
-
-        acc_total = account.insights.get('uncommon', 0) + account.insights.get('rare', 0) + \
-            account.insights.get('legendary', 0) + account.insights.get('mythical', 0)
-
-        total['airdrop'] += account.airdrop
-        total['airdrop_claimed'] += 1 if account.airdrop_claimed else 0
-        total['total'] += acc_total
-        total['uncommon'] += account.insights.get('uncommon', 0)
-        total['rare'] += account.insights.get('rare', 0)
-        total['legendary'] += account.insights.get('legendary', 0)
-        total['mythical'] += account.insights.get('mythical', 0)
-        if account.daily_insight.endswith('available'):
-            total['daily_available'] += 1
-            daily_available_acc_ids.append(idx)
-        elif account.daily_insight.endswith('claimed'):
-            total['daily_claimed'] += 1
-        if account.daily_mint:
-            total['daily_minted'] += 1
-        else:
-            daily_mint_not_done_ids.append(idx)
-        total['to_open'] += account.insights_to_open
-        total['pending'] += account.pending_quests
-        if account.next_breathe_str() == 'Completed':
-            total['breathe'] += 1
-        total['well_id'] += 1 if account.well_id else 0
-        total['ring_registered'] += 1 if account.ring_registered else 0
-        total['human_proof'] += 1 if account.claimed_human_proof else 0
-        total['bybit_id'] += 1 if account.bybit_id != '' else 0
-
-        csv_data.append([idx, address, int(account.airdrop / 10 ** 18), account.airdrop_claimed, account.claimed_human_proof, account.bybit_id,
-                         account.well_id, account.ring_registered, acc_total,
-                         account.insights.get('uncommon'), account.insights.get('rare'),
-                         account.insights.get('legendary'), account.insights.get('mythical'),
-                         account.daily_insight.capitalize(), account.insights_to_open,
-                         account.pending_quests, account.daily_mint, account.next_breathe_str(),
-                         len(account.invite_codes), account.exp, account.lvl])
-
-    csv_data.extend([[], ['', 'Total', int(total['airdrop'] / 10 ** 18), total['airdrop_claimed'], total['human_proof'], total['bybit_id'],
-                          total['well_id'], total['ring_registered'], total['total'],
-                          total['uncommon'], total['rare'],
-                          total['legendary'], total['mythical'],
-                          f'{total["daily_available"]}/{total["daily_claimed"]}',
-                          total['to_open'], total['pending'], total['daily_minted'], total['breathe']]])
-    csv_data.append(['', '', 'Airdrop', 'Airdrop Claimed', 'Human Proof', 'Bybit ID', 'Well ID', 'Ring Registered',
-                     'Total', 'Uncommon', 'Rare', 'Legendary', 'Mythical',
-                     'Daily insight', 'Insights to open', 'Pending quests', 'Daily mint', 'Next breathe'])
-
     run_timestamp = str(datetime.now())
-    csv_data.extend([[], ['', 'Timestamp', run_timestamp]])
+    total = storage.get_totals(addresses)
 
-    with open('results/stats.csv', 'w', encoding='utf-8', newline='') as file:
+    with open('results/stats.csv', 'w', encoding='utf-8', newline='') as file, \
+            open('results/invites.txt', 'w', encoding='utf-8') as invites_file:
         writer = csv.writer(file, delimiter=';')
-        writer.writerows(csv_data)
-
-    with open('results/invites.txt', 'w', encoding='utf-8') as file:
-        for ic in all_invite_codes:
-            file.write(f'{ic}\n')
+        writer.writerow(['#', 'Address', 'Airdrop', 'Airdrop Claimed', 'Human Proof', 'Bybit ID', 'Well ID',
+                         'Ring Registered', 'Total', 'Uncommon', 'Rare', 'Legendary', 'Mythical',
+                         'Daily insight', 'Insights to open', 'Pending quests', 'Daily mint', 'Next breathe',
+                         'Invite codes', 'Exp', 'Lvl'])
+        for idx, (address, account) in enumerate(storage.iter_account_infos(addresses), start=1):
+            if account is None:
+                writer.writerow([idx, address])
+                continue
+
+            for ic in account.invite_codes:
+                invites_file.write(f'{ic}\n')
+
+            uncommon, rare = account.insights.get('uncommon'), account.insights.get('rare')
+            legendary, mythical = account.insights.get('legendary'), account.insights.get('mythical')
+            acc_total = (uncommon or 0) + (rare or 0) + (legendary or 0) + (mythical or 0)
+
+            writer.writerow([idx, address, int(account.airdrop / 10 ** 18), account.airdrop_claimed,
+                             account.claimed_human_proof, account.bybit_id,
+                             account.well_id, account.ring_registered, acc_total,
+                             uncommon, rare, legendary, mythical,
+                             account.daily_insight.capitalize(), account.insights_to_open,
+                             account.pending_quests, account.daily_mint, account.next_breathe_str(),
+                             len(account.invite_codes), account.exp, account.lvl])
+
+        writer.writerows([[], ['', 'Total', int(total['airdrop'] / 10 ** 18), total['airdrop_claimed'],
+                               total['human_proof'], total['bybit_id'],
+                               total['well_id'], total['ring_registered'], total['total'],
+                               total['uncommon'], total['rare'],
+                               total['legendary'], total['mythical'],
+                               f'{total["daily_available"]}/{total["daily_claimed"]}',
+                               total['to_open'], total['pending'], total['daily_minted'], total['breathe']]])
+        writer.writerow(['', '', 'Airdrop', 'Airdrop Claimed', 'Human Proof', 'Bybit ID', 'Well ID',
+                         'Ring Registered', 'Total', 'Uncommon', 'Rare', 'Legendary', 'Mythical',
+                         'Daily insight', 'Insights to open', 'Pending quests', 'Daily mint', 'Next breathe'])
+        writer.writerows([[], ['', 'Timestamp', run_timestamp]])
 
     logger.info(f'Total airdrop $WELL: {int(total["airdrop"] / 10 ** 18)}')
     print()
@@ -424,7 +557,22 @@ def main():
     logger.info(f'Timestamp: {run_timestamp}')
 
 
+def run(profile_cpu: Optional[str] = None):
+    start_cpu_profiler(profile_cpu)
+    start_memory_tracking()
+    try:
+        main()
+    finally:
+        stop_cpu_profiler()
+        memory_checkpoint()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--profile-cpu', nargs='?', const='results/cpu_profile.txt', default=None, metavar='FILE',
+                        help='sample CPU stacks of the run by stage into FILE (collapsed stacks for speedscope)')
+    args = parser.parse_args()
+
     cprint('###############################################################', 'cyan')
     cprint('#################', 'cyan', end='')
     cprint(' https://t.me/thelaziestcoder ', 'magenta', end='')
@@ -440,11 +588,11 @@ if __name__ == '__main__':
     if LOOP_RUNS:
         while True:
             st = int(time.time())
-            main()
+            run(args.profile_cpu)
             time.sleep(3600 * 3)
             time.sleep(random.randint(1, 20) * 60)
-            main()
+            run(args.profile_cpu)
             time.sleep(3600 * 24 - (int(time.time()) - st))
             time.sleep(random.randint(0, 120))
     else:
-        main()
+        run(args.profile_cpu)
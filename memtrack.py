@@ -0,0 +1,106 @@
+import gc
+import os
+import asyncio
+import threading
+import tracemalloc
+from aiohttp import ClientSession
+from loguru import logger
+from typing import Optional
+
+from config import MEMORY_SNAPSHOTS, MEMORY_TOP_DIFFS
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def get_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0
+
+
+def count_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return 0
+
+
+def memory_stats() -> dict:
+    gc.collect()
+    sessions, loops = 0, 0
+    for obj in gc.get_objects():
+        if isinstance(obj, ClientSession):
+            sessions += 1
+        elif isinstance(obj, asyncio.AbstractEventLoop):
+            loops += 1
+    return {
+        'rss_mb': get_rss_mb(),
+        'traced_mb': tracemalloc.get_traced_memory()[0] / 1024 / 1024 if tracemalloc.is_tracing() else 0,
+        'sessions': sessions,
+        'loops': loops,
+        'threads': threading.active_count(),
+        'fds': count_fds(),
+    }
+
+
+class MemoryTracker:
+
+    def __init__(self, top: int = MEMORY_TOP_DIFFS):
+        self.top = top
+        self.cycle = 0
+        self.first: Optional[dict] = None
+        self.prev: Optional[tracemalloc.Snapshot] = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def checkpoint(self) -> dict:
+        self.cycle += 1
+        stats = memory_stats()
+        if self.first is None:
+            self.first = stats
+        logger.info(f'Memory after cycle {self.cycle}: RSS {stats["rss_mb"]:.0f} MB '
+                    f'({stats["rss_mb"] - self.first["rss_mb"]:+.0f} MB since cycle 1), '
+                    f'traced {stats["traced_mb"]:.1f} MB, {stats["sessions"]} HTTP sessions, '
+                    f'{stats["loops"]} event loops, {stats["threads"]} threads, {stats["fds"]} open files')
+        if not tracemalloc.is_tracing():
+            return stats
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ))
+        if self.prev is not None:
+            growth = [d for d in snapshot.compare_to(self.prev, 'lineno') if d.size_diff > 0][:self.top]
+            if len(growth) > 0:
+                logger.info(f'Top memory growth since cycle {self.cycle - 1}:\n' +
+                            '\n'.join(f'  {str(d)}' for d in growth))
+        self.prev = snapshot
+        return stats
+
+
+_memory_tracker: Optional[MemoryTracker] = None
+
+
+def start_memory_tracking(enabled: bool = MEMORY_SNAPSHOTS):
+    global _memory_tracker
+    if not enabled:
+        return
+    if _memory_tracker is None:
+        _memory_tracker = MemoryTracker()
+    _memory_tracker.start()
+
+
+def memory_checkpoint():
+    if _memory_tracker is not None:
+        _memory_tracker.checkpoint()
@@ -0,0 +1,212 @@
+import time
+import threading
+from aiohttp import TraceConfig
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from loguru import logger
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config import METRICS_HOST, METRICS_PORT
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Metric:
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels_str(self, key: Tuple[str, ...], extra: str = None) -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra is not None:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if len(pairs) > 0 else ''
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{self._labels_str(key)} {_format(value)}' for key, value in list(self.values.items())]
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        data = self.values.get(key)
+        if data is None:
+            data = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, cnt in zip(self.buckets + (float('inf'),), counts):
+                cumulative += cnt
+                le = 'le="' + ('+Inf' if bound == float('inf') else _format(bound)) + '"'
+                lines.append(f'{self.name}_bucket{self._labels_str(key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._labels_str(key)} {_format(total)}')
+            lines.append(f'{self.name}_count{self._labels_str(key)} {count}')
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+_registry: List[Metric] = []
+
+ACCOUNTS = Counter('gm_accounts_total', 'Processed accounts', ('status',))
+ACCOUNTS_IN_PROGRESS = Gauge('gm_accounts_in_progress', 'Accounts being processed right now')
+STAGES = Counter('gm_stages_total', 'Finished account stages', ('stage', 'status'))
+RETRIES = Counter('gm_retries_total', 'Retries made by async_retry', ('func', 'stage'))
+REQUESTS = Counter('gm_requests_total', 'Upstream HTTP requests', ('upstream', 'status'))
+REQUESTS_IN_PROGRESS = Gauge('gm_requests_in_progress', 'Upstream HTTP requests in flight', ('upstream',))
+REQUEST_LATENCY = Histogram('gm_request_duration_seconds', 'Upstream HTTP request latency', ('upstream',))
+GAS_WAIT = Histogram('gm_gas_wait_seconds', 'Time spent waiting for acceptable gas price')
+TX_CONFIRM = Histogram('gm_tx_confirm_seconds', 'Time from tx sent to receipt', ('chain', 'status'))
+LOOP_LAG = Histogram('gm_loop_lag_seconds', 'Event loop scheduling delay',
+                     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+LOOP_STALLS = Counter('gm_loop_stalls_total', 'Event loop stalls by blocking code location', ('location',))
+
+
+_stage: ContextVar[str] = ContextVar('stage', default='')
+
+
+def get_stage() -> str:
+    return _stage.get()
+
+
+def set_stage(stage: str):
+    prev = _stage.get()
+    if prev != '':
+        STAGES.inc(stage=prev, status='ok')
+    _stage.set(stage)
+
+
+def fail_stage(status: str = 'failed'):
+    STAGES.inc(stage=_stage.get() or 'unknown', status=status)
+    _stage.set('')
+
+
+def get_upstream(url) -> str:
+    host = urlparse(str(url)).hostname or ''
+    if host.endswith('gm.io'):
+        return 'well3'
+    if host.endswith('googleapis.com'):
+        return 'google'
+    if host.endswith('twitter.com') or host.endswith('x.com'):
+        return 'twitter'
+    return host
+
+
+async def _on_request_start(_, ctx, params):
+    ctx.upstream = get_upstream(params.url)
+    ctx.start = time.perf_counter()
+    REQUESTS_IN_PROGRESS.inc(upstream=ctx.upstream)
+
+
+def _on_request_done(ctx, status):
+    REQUESTS_IN_PROGRESS.dec(upstream=ctx.upstream)
+    REQUESTS.inc(upstream=ctx.upstream, status=status)
+    REQUEST_LATENCY.observe(time.perf_counter() - ctx.start, upstream=ctx.upstream)
+
+
+async def _on_request_end(_, ctx, params):
+    _on_request_done(ctx, params.response.status)
+
+
+async def _on_request_exception(_, ctx, __):
+    _on_request_done(ctx, 'error')
+
+
+def _create_trace_config() -> TraceConfig:
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+TRACE_CONFIGS = [_create_trace_config()]
+
+
+def render_metrics() -> str:
+    return '\n'.join(m.render() for m in _registry) + '\n'
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: Optional[int] = METRICS_PORT):
+    global _server
+    if port is None or _server is not None:
+        return
+    _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    logger.info(f'Metrics are served on http://{host}:{port}/metrics')
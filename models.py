@@ -12,6 +12,8 @@ class AccountInfo:
     address: str = ''
     proxy: str = ''
     twitter_auth_token: str = ''
+    twitter_ct0: str = ''
+    twitter_ct0_expire_at: int = 0
     well3_auth_token: str = ''
     well3_auth_token_expire_at: int = 0
     well3_refresh_token: str = ''
@@ -25,6 +27,8 @@ class AccountInfo:
     pending_quests: int = 0
     insights_to_open: int = 0
     daily_insight: str = 'unavailable'
+    contract_rank: int = -1  # rankupQuest currentRank of the insights contract, -1 until the profile is read
+    daily_quest_nonce: str = ''
     daily_mint: bool = False
     insights: dict[str, int] = field(default_factory=dict)
     invite_codes: List[str] = field(default_factory=list)
@@ -35,6 +39,9 @@ class AccountInfo:
     claimed_human_proof: bool = False
     airdrop: int = 0
     airdrop_claimed: bool = False
+    airdrop_sig: str = ''
+    airdrop_claim_tx: str = ''  # claimV2 tx hash until its receipt is seen
+    deferred_stage: str = ''  # stage that ran out of time in the last run
 
     def next_breathe_str(self) -> str:
         if type(self.next_breathe_time) is str:
@@ -0,0 +1,130 @@
+from loguru import logger
+from typing import List, Tuple, Optional, Dict
+from web3 import AsyncWeb3
+
+from storage import Storage
+from contracts import INSIGHTS, CLAIM_HUMAN_PROOF, MULTICALL3, ContractCall
+from config import RPC_ETH, RPC_BATCH_MAX_SIZE, MULTICALL_MAX_CALLDATA_SIZE
+from utils import get_w3, close_w3, rpc_batch, to_bytes
+
+
+CALL_OVERHEAD_SIZE = 5 * 32
+
+
+class Multicall:
+
+    def __init__(self, w3: AsyncWeb3, max_calldata_size: int = MULTICALL_MAX_CALLDATA_SIZE):
+        self.w3 = w3
+        self.max_calldata_size = max_calldata_size
+
+    def _chunks(self, calls):
+        chunk, size = [], 0
+        for call in calls:
+            call_size = len(call[2]) + CALL_OVERHEAD_SIZE
+            if len(chunk) > 0 and size + call_size > self.max_calldata_size:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(call)
+            size += call_size
+        if len(chunk) > 0:
+            yield chunk
+
+    async def aggregate(self, contract_calls: List[ContractCall]) -> List[Optional[object]]:
+        calls = [(c.address, True, c.data) for c in contract_calls]
+        requests = [('eth_call', [{
+            'to': MULTICALL3.address,
+            'data': '0x' + MULTICALL3.aggregate3(chunk).data.hex(),
+        }, 'latest']) for chunk in self._chunks(calls)]
+
+        raw_results = []
+        for i in range(0, len(requests), RPC_BATCH_MAX_SIZE):
+            raw_results.extend(await rpc_batch(self.w3, requests[i:i + RPC_BATCH_MAX_SIZE]))
+
+        results = []
+        for raw in raw_results:
+            results.extend(MULTICALL3.functions['aggregate3'].decode(to_bytes(raw)))
+
+        return [c.codec.decode(data) if success else None
+                for c, (success, data) in zip(contract_calls, results)]
+
+
+class FleetStatusReader:
+
+    def __init__(self, storage: Storage, proxy: str = None):
+        self.storage = storage
+        self.w3 = get_w3(proxy)
+        self.w3_eth = get_w3(proxy, rpc=RPC_ETH)
+
+    async def close(self):
+        await close_w3(self.w3)
+        await close_w3(self.w3_eth)
+
+    async def __aenter__(self) -> "FleetStatusReader":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def read(self, addresses: List[str],
+                   daily_nonces: Dict[str, str] = None, airdrop_sigs: Dict[str, str] = None):
+        # Daily nonces change every day, so only fresh ones are read. Airdrop signatures default to stored ones
+        daily_nonces = daily_nonces or {}
+
+        infos = {}
+        for address in addresses:
+            info = await self.storage.get_account_info(address)
+            if info is not None:
+                infos[address] = info
+        if airdrop_sigs is None:
+            airdrop_sigs = {address: info.airdrop_sig for address, info in infos.items() if info.airdrop_sig != ''}
+
+        insights_calls: List[Tuple[str, str, ContractCall]] = []
+        claim_calls: List[Tuple[str, str, ContractCall]] = []
+        for address, info in infos.items():
+            insights_calls.append((address, 'results', INSIGHTS.questResults(address)))
+            if info.contract_rank >= 0:
+                insights_calls.append((address, 'to_open', INSIGHTS.getQuests(info.contract_rank, address)))
+            if address in daily_nonces:
+                insights_calls.append((address, 'daily', INSIGHTS.nonceUsed(daily_nonces[address])))
+            claim_calls.append((address, 'human_proof', CLAIM_HUMAN_PROOF.claimedMap(address)))
+            if address in airdrop_sigs:
+                claim_calls.append((address, 'airdrop', CLAIM_HUMAN_PROOF.
+                                    isSignatureClaimed(to_bytes(airdrop_sigs[address]))))
+
+        insights_results = await Multicall(self.w3).aggregate([c[2] for c in insights_calls])
+        claim_results = await Multicall(self.w3_eth).aggregate([c[2] for c in claim_calls])
+
+        failed = 0
+        for (address, kind, _), result in zip(insights_calls + claim_calls, insights_results + claim_results):
+            if result is None:
+                failed += 1
+                continue
+            info = infos[address]
+            match kind:
+                case 'results':
+                    info.insights = {
+                        'uncommon': result[0],
+                        'rare': result[1],
+                        'legendary': result[2],
+                        'mythical': result[3],
+                    }
+                case 'to_open':
+                    info.insights_to_open = result
+                case 'daily':
+                    prefix = 'SUPER ' if info.daily_insight.startswith('SUPER') else ''
+                    info.daily_insight = prefix + ('claimed' if result else 'available')
+                case 'human_proof':
+                    info.claimed_human_proof = info.claimed_human_proof or result
+                case 'airdrop':
+                    info.airdrop_claimed = result
+
+        for address, info in infos.items():
+            await self.storage.set_account_info(address, info)
+
+        logger.info(f'Fleet status: {len(infos)} accounts, '
+                    f'{len(insights_calls) + len(claim_calls)} calls, {failed} failed')
+
+
+async def read_fleet_status(storage: Storage, addresses: List[str], **kwargs):
+    async with FleetStatusReader(storage) as reader:
+        await reader.read(addresses, **kwargs)
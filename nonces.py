@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager
+from loguru import logger
+from typing import Dict
+from web3 import AsyncWeb3
+
+
+class NonceManager:
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.nonces: Dict[str, int] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.reserved: Dict[str, int] = {}  # nonces handed out whose tx is not sent yet
+
+    @classmethod
+    def _key(cls, w3: AsyncWeb3, address: str) -> str:
+        return f'{getattr(w3.provider, "endpoint_uri", "")}:{address.lower()}'
+
+    async def allocate(self, w3: AsyncWeb3, address: str) -> int:
+        key = self._key(w3, address)
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            if key not in self.nonces:
+                self.nonces[key] = await w3.eth.get_transaction_count(address, 'pending')
+            nonce = self.nonces[key]
+            self.nonces[key] += 1
+            return nonce
+
+    @asynccontextmanager
+    async def reserve(self, w3: AsyncWeb3, address: str):
+        # Held until the tx is sent. Stage deadlines cancel the task, so the nonce is given back on CancelledError too
+        key = self._key(w3, address)
+        nonce = await self.allocate(w3, address)
+        self.reserved[key] = self.reserved.get(key, 0) + 1
+        try:
+            yield nonce
+        except BaseException:
+            self.release(w3, address, nonce)
+            raise
+        finally:
+            self.reserved[key] -= 1
+            if self.reserved[key] == 0:
+                self.reserved.pop(key)
+
+    def release(self, w3: AsyncWeb3, address: str, nonce: int):
+        key = self._key(w3, address)
+        if key not in self.nonces:
+            # Already reset by a failed send, the next tx reads the pending count
+            return
+        if self.nonces.get(key) == nonce + 1:
+            self.nonces[key] = nonce
+            return
+        logger.warning(f'{address}) Nonce {nonce} released out of order, resyncing with chain')
+        self.reset(w3, address)
+
+    def reset(self, w3: AsyncWeb3, address: str):
+        self.nonces.pop(self._key(w3, address), None)
+
+    async def reconcile(self, w3: AsyncWeb3, address: str):
+        # A tx that timed out pending may have been dropped or replaced, so the local counter can be ahead of the node
+        key = self._key(w3, address)
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            try:
+                nonce = await w3.eth.get_transaction_count(address, 'pending')
+            except Exception as e:
+                if key in self.reserved:
+                    logger.warning(f'{address}) Failed to reconcile nonce, keeping the local one: {str(e)}')
+                    return
+                logger.warning(f'{address}) Failed to reconcile nonce, resyncing on next tx: {str(e)}')
+                self.nonces.pop(key, None)
+                return
+            if key in self.reserved and key in self.nonces:
+                # Reserved nonces are not in the pending count until their txs are sent
+                nonce = max(nonce, self.nonces[key])
+            if key in self.nonces and self.nonces[key] != nonce:
+                logger.warning(f'{address}) Local nonce {self.nonces[key]} reconciled to pending {nonce}')
+            self.nonces[key] = nonce
+
+
+_nonce_manager = None
+
+
+def get_nonce_manager() -> NonceManager:
+    global _nonce_manager
+    if _nonce_manager is None or _nonce_manager.loop is not asyncio.get_running_loop():
+        _nonce_manager = NonceManager()
+    return _nonce_manager
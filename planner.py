@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+from loguru import logger
+from typing import Dict, List
+
+from storage import Storage
+from multicall import read_fleet_status
+from config import PLAN_FILE
+
+
+class Planner:
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.indexes: Dict[str, int] = {}
+        self.airdrop_sigs: Dict[str, str] = {}
+
+    def add(self, idx: int, address: str, airdrop_sig: str = None):
+        self.indexes[address] = idx
+        if airdrop_sig is not None:
+            self.airdrop_sigs[address] = airdrop_sig
+
+    async def build(self) -> List[dict]:
+        if len(self.indexes) > 0:
+            await read_fleet_status(self.storage, list(self.indexes), airdrop_sigs=self.airdrop_sigs)
+        plan = []
+        for address, idx in sorted(self.indexes.items(), key=lambda item: item[1]):
+            info = self.storage.get_final_account_info(address)
+            actions = []
+            if info.airdrop > 0 and not info.airdrop_claimed:
+                actions.append('claim_airdrop')
+            plan.append({
+                'idx': idx,
+                'address': address,
+                'airdrop': str(info.airdrop),
+                'actions': actions,
+            })
+        return plan
+
+
+def save_plan(plan: List[dict], filename: str = PLAN_FILE):
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump({'created_at': str(datetime.now()), 'accounts': plan}, file, indent=2)
+    writes = len([p for p in plan if len(p['actions']) > 0])
+    logger.info(f'Plan for {len(plan)} accounts with {writes} writes is stored in {filename}')
+
+
+def load_plan(filename: str = PLAN_FILE) -> List[dict]:
+    with open(filename, 'r', encoding='utf-8') as file:
+        plan = json.load(file)
+    logger.info(f'Loaded plan from {plan["created_at"]}')
+    return plan['accounts']
@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from loguru import logger
+from typing import Dict, List, Optional
+
+from loopmon import ROOT
+
+
+# Stage groups by the innermost module of our own code on the stack
+GROUPS = {
+    'well3.py': 'Well3',
+    'twitter.py': 'Twitter',
+    'account.py': 'Account',
+    'signer.py': 'Account',
+    'nonces.py': 'Account',
+    'contracts.py': 'Account',
+    'gas_oracle.py': 'Account',
+    'receipts.py': 'Account',
+    'broadcast.py': 'Account',
+    'async_web3.py': 'RPC',
+    'multicall.py': 'RPC',
+    'events.py': 'RPC',
+    'storage.py': 'Storage',
+    'models.py': 'Storage',
+}
+
+
+def _cpu_clock(thread_id: int) -> Optional[int]:
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.clock = _cpu_clock(thread_id)
+        self.stacks = Counter()
+        self.samples = 0
+        self.labels: Dict[object, str] = {}
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name='cpu-profiler', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(ROOT):
+                filename = os.path.relpath(filename, ROOT)
+            elif 'site-packages' in filename:
+                filename = filename.split('site-packages' + os.sep, 1)[1]
+            else:
+                filename = os.sep.join(filename.split(os.sep)[-2:])
+            name = getattr(code, 'co_qualname', code.co_name)
+            label = self.labels[code] = f'{name} ({filename}:{code.co_firstlineno})'.replace(';', ',')
+        return label
+
+    def _collapse(self, frame) -> str:
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        # Inside the event loop start from the callback or task step, so coroutines of every account line up
+        for i in range(len(codes) - 1, -1, -1):
+            if codes[i].co_name == '_run' and codes[i].co_filename.endswith(os.path.join('asyncio', 'events.py')):
+                codes = codes[i + 1:]
+                break
+        group = 'Loop'
+        for code in reversed(codes):
+            if not code.co_filename.startswith(ROOT):
+                continue
+            basename = os.path.basename(code.co_filename)
+            if basename == 'main.py':
+                group = 'Report' if code.co_name in ('main', '<module>', 'run') else 'Main'
+            else:
+                group = GROUPS.get(basename, 'Other')
+            break
+        return ';'.join([group] + [self._label(code) for code in codes])
+
+    def _run(self):
+        last_cpu = time.clock_gettime(self.clock) if self.clock is not None else None
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if self.clock is not None:
+                cpu = time.clock_gettime(self.clock)
+                weight, last_cpu = int((cpu - last_cpu) * 1000000), cpu
+            else:
+                weight = int(self.interval * 1000000)
+            if weight <= 0:
+                continue
+            self.stacks[self._collapse(frame)] += weight
+            self.samples += 1
+            del frame
+
+    def save(self, filename: str):
+        with open(filename, 'w', encoding='utf-8') as file:
+            for stack, weight in self.stacks.items():
+                file.write(f'{stack} {weight}\n')
+
+    def summary(self) -> List[str]:
+        total = sum(self.stacks.values())
+        groups = Counter()
+        for stack, weight in self.stacks.items():
+            groups[stack.split(';', 1)[0]] += weight
+        return [f'{group}: {weight / 1000000:.1f}s ({weight / total:.0%})' for group, weight in groups.most_common()]
+
+
+_profiler: Optional[SamplingProfiler] = None
+_filename: Optional[str] = None
+
+
+def start_cpu_profiler(filename: Optional[str], interval: float = 0.005):
+    global _profiler, _filename
+    if filename is None:
+        return
+    if _profiler is None:
+        _profiler = SamplingProfiler(threading.get_ident(), interval)
+        if _profiler.clock is None:
+            logger.warning('Thread CPU clock is not available, profile is weighted by wall time')
+    _filename = filename
+    _profiler.start()
+
+
+def stop_cpu_profiler():
+    if _profiler is None:
+        return
+    _profiler.stop()
+    if _profiler.samples == 0:
+        return
+    _profiler.save(_filename)
+    logger.info(f'CPU profile with {_profiler.samples} samples is stored in {_filename} '
+                f'(collapsed stacks in microseconds, open with speedscope or flamegraph.pl)')
+    logger.info(f'CPU by stage: {", ".join(_profiler.summary())}')
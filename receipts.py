@@ -0,0 +1,114 @@
+import time
+import asyncio
+from loguru import logger
+from typing import Dict, List, Optional, Set, cast
+from web3._utils.method_formatters import receipt_formatter
+from web3.types import TxReceipt
+
+from async_web3 import AsyncHTTPProviderWithProxy
+from config import RECEIPT_POLL_INTERVAL, RPC_BATCH_MAX_SIZE
+from utils import get_w3, close_w3
+from metrics import TX_CONFIRM, get_upstream
+from tracing import span, clear_trace_account
+
+
+class ReceiptTracker:
+
+    def __init__(self, rpc: str, poll_interval: float = RECEIPT_POLL_INTERVAL):
+        self.rpc = rpc
+        self.w3 = get_w3(rpc=rpc)
+        self.poll_interval = poll_interval
+        self.loop = asyncio.get_running_loop()
+        self.pending: Dict[str, List[asyncio.Future]] = {}
+        self.unchecked: Set[str] = set()
+        self.last_block: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await close_w3(self.w3)
+
+    async def wait(self, tx_hash, timeout: float = 150) -> Optional[TxReceipt]:
+        self.start()
+        tx_hash = tx_hash.hex() if type(tx_hash) is not str else tx_hash
+        future = self.loop.create_future()
+        self.pending.setdefault(tx_hash, []).append(future)
+        self.unchecked.add(tx_hash)
+        start = time.perf_counter()
+        try:
+            with span('receipt_wait', 'wait', tx_hash=tx_hash):
+                receipt = await asyncio.wait_for(future, timeout)
+            status = 'success' if receipt.get('status') == 1 else 'reverted'
+            TX_CONFIRM.observe(time.perf_counter() - start, chain=get_upstream(self.rpc), status=status)
+            return receipt
+        except asyncio.TimeoutError:
+            TX_CONFIRM.observe(time.perf_counter() - start, chain=get_upstream(self.rpc), status='timeout')
+            return None
+        finally:
+            futures = self.pending.get(tx_hash, [])
+            if future in futures:
+                futures.remove(future)
+            if len(futures) == 0:
+                self.pending.pop(tx_hash, None)
+                self.unchecked.discard(tx_hash)
+
+    async def _run(self):
+        clear_trace_account()
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f'Receipt tracker poll failed for {self.rpc}: {str(e)}')
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self):
+        if len(self.pending) == 0:
+            return
+        block = await self.w3.eth.block_number
+        if block != self.last_block:
+            self.last_block = block
+            hashes = list(self.pending)
+        else:
+            hashes = list(self.unchecked)
+        self.unchecked.clear()
+        if len(hashes) == 0:
+            return
+
+        provider = cast(AsyncHTTPProviderWithProxy, self.w3.manager.provider)
+        for i in range(0, len(hashes), RPC_BATCH_MAX_SIZE):
+            chunk = hashes[i:i + RPC_BATCH_MAX_SIZE]
+            responses = await provider.make_batch_request([('eth_getTransactionReceipt', [h]) for h in chunk])
+            for tx_hash, response in zip(chunk, responses):
+                if response.get('result') is None:
+                    continue
+                receipt = receipt_formatter(response['result'])
+                for future in self.pending.pop(tx_hash, []):
+                    if not future.done():
+                        future.set_result(receipt)
+
+
+_receipt_trackers: Dict[str, ReceiptTracker] = {}
+
+
+def get_receipt_tracker(rpc: str) -> ReceiptTracker:
+    tracker = _receipt_trackers.get(rpc)
+    if tracker is None or tracker.loop is not asyncio.get_running_loop():
+        tracker = ReceiptTracker(rpc)
+        _receipt_trackers[rpc] = tracker
+    return tracker
+
+
+async def stop_receipt_trackers():
+    for tracker in list(_receipt_trackers.values()):
+        await tracker.stop()
+    _receipt_trackers.clear()
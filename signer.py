@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from eth_account import Account as EthAccount
+
+from config import SIGNING_PROCESSES
+
+
+def sign_transaction(tx: dict, private_key: str) -> bytes:
+    return bytes(EthAccount.sign_transaction(tx, private_key).rawTransaction)
+
+
+def sign_transactions(items: List[Tuple[dict, str]]) -> List[bytes]:
+    return [sign_transaction(tx, private_key) for tx, private_key in items]
+
+
+class SigningService:
+
+    def __init__(self, processes: int = SIGNING_PROCESSES):
+        self.processes = processes
+        self.executor = ProcessPoolExecutor(processes) if processes > 0 else None
+
+    async def sign(self, tx: dict, private_key: str) -> bytes:
+        if self.executor is None:
+            return sign_transaction(tx, private_key)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, sign_transaction, tx, private_key)
+
+    async def sign_many(self, items: List[Tuple[dict, str]]) -> List[bytes]:
+        if self.executor is None:
+            return sign_transactions(items)
+        loop = asyncio.get_running_loop()
+        chunk_size = max(1, -(-len(items) // self.processes))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = await asyncio.gather(*[
+            loop.run_in_executor(self.executor, sign_transactions, chunk) for chunk in chunks
+        ])
+        return [raw for chunk in results for raw in chunk]
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+_signing_service: Optional[SigningService] = None
+
+
+def get_signing_service() -> SigningService:
+    global _signing_service
+    if _signing_service is None:
+        _signing_service = SigningService()
+    return _signing_service
+
+
+def shutdown_signing_service():
+    global _signing_service
+    if _signing_service is not None:
+        _signing_service.shutdown()
+        _signing_service = None
@@ -1,19 +1,52 @@
 import json
 import asyncio
 from copy import deepcopy
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from models import AccountInfo
 
 
+TOTAL_KEYS = [
+    'total', 'uncommon', 'rare', 'legendary', 'mythical',
+    'daily_claimed', 'daily_available', 'daily_minted', 'to_open', 'pending', 'breathe',
+    'well_id', 'ring_registered', 'human_proof', 'bybit_id', 'airdrop', 'airdrop_claimed',
+]
+
+
+def account_totals(info: AccountInfo) -> List[Tuple[str, int]]:
+    uncommon, rare = info.insights.get('uncommon', 0), info.insights.get('rare', 0)
+    legendary, mythical = info.insights.get('legendary', 0), info.insights.get('mythical', 0)
+    return [
+        ('total', uncommon + rare + legendary + mythical),
+        ('uncommon', uncommon),
+        ('rare', rare),
+        ('legendary', legendary),
+        ('mythical', mythical),
+        ('daily_claimed', 1 if info.daily_insight.endswith('claimed') else 0),
+        ('daily_available', 1 if info.daily_insight.endswith('available') else 0),
+        ('daily_minted', 1 if info.daily_mint else 0),
+        ('to_open', info.insights_to_open),
+        ('pending', info.pending_quests),
+        ('breathe', 1 if info.next_breathe_time == 'Completed' else 0),
+        ('well_id', 1 if info.well_id else 0),
+        ('ring_registered', 1 if info.ring_registered else 0),
+        ('human_proof', 1 if info.claimed_human_proof else 0),
+        ('bybit_id', 1 if info.bybit_id != '' else 0),
+        ('airdrop', info.airdrop),
+        ('airdrop_claimed', 1 if info.airdrop_claimed else 0),
+    ]
+
+
 class Storage:
 
     def __init__(self, filename: str):
         self.filename = filename
         self.data = {}
+        self.totals: Dict[str, int] = dict.fromkeys(TOTAL_KEYS, 0)
         self.lock = asyncio.Lock()
 
     def init(self):
+        self.totals = dict.fromkeys(TOTAL_KEYS, 0)
         with open(self.filename, 'r', encoding='utf-8') as file:
             if len(file.read().strip()) == 0:
                 self.data = {}
@@ -21,6 +54,29 @@ class Storage:
         with open(self.filename, 'r', encoding='utf-8') as file:
             converted_data = json.load(file)
         self.data = {a: AccountInfo.from_dict(i) for a, i in converted_data.items()}
+        for info in self.data.values():
+            self._update_totals(info, 1)
+
+    def _update_totals(self, info: AccountInfo, sign: int):
+        for key, value in account_totals(info):
+            self.totals[key] += sign * value
+
+    def get_totals(self, addresses: Iterable[str] = None) -> Dict[str, int]:
+        if addresses is None:
+            return dict(self.totals)
+        addresses = set(addresses)
+        if self.data.keys() <= addresses:
+            return dict(self.totals)
+        totals = dict.fromkeys(TOTAL_KEYS, 0)
+        for address in addresses:
+            if (info := self.data.get(address)) is not None:
+                for key, value in account_totals(info):
+                    totals[key] += value
+        return totals
+
+    def iter_account_infos(self, addresses: Iterable[str]) -> Iterator[Tuple[str, Optional[AccountInfo]]]:
+        for address in addresses:
+            yield address, self.data.get(address)
 
     def get_final_account_info(self, address: str) -> Optional[AccountInfo]:
         info = self.data.get(address)
@@ -29,11 +85,14 @@ class Storage:
         return deepcopy(info)
 
     def set_final_account_info(self, address: str, info: AccountInfo):
+        if (old_info := self.data.get(address)) is not None:
+            self._update_totals(old_info, -1)
         self.data[address] = deepcopy(info)
+        self._update_totals(info, 1)
 
     def remove(self, address: str):
         if address in self.data:
-            self.data.pop(address)
+            self._update_totals(self.data.pop(address), -1)
 
     async def get_account_info(self, address: str) -> Optional[AccountInfo]:
         async with self.lock:
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+from aiohttp import TraceConfig
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from loguru import logger
+from typing import Dict, List, Optional, Tuple
+
+from config import TRACE_FILE
+from metrics import TRACE_CONFIGS, get_upstream
+
+
+_account: ContextVar[int] = ContextVar('trace_account', default=0)
+
+
+class Tracer:
+
+    def __init__(self):
+        self.enabled = False
+        self.start_ns = time.perf_counter_ns()
+        self.events: List[Tuple[str, str, int, int, int, Optional[dict]]] = []
+        self.threads: Dict[int, str] = {0: 'main'}
+
+    def start(self):
+        self.enabled = True
+        self.start_ns = time.perf_counter_ns()
+        self.events = []
+        self.threads = {0: 'main'}
+
+    def add(self, name: str, cat: str, start_ns: int, end_ns: int, args: dict = None):
+        if self.enabled:
+            self.events.append((name, cat, _account.get(), start_ns, end_ns, args))
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in self.threads.items()]
+        for name, cat, tid, start_ns, end_ns, args in self.events:
+            event = {
+                'name': name, 'cat': cat, 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': (start_ns - self.start_ns) / 1000, 'dur': (end_ns - start_ns) / 1000,
+            }
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, filename: str):
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(self.to_chrome_trace(), file)
+        logger.info(f'Trace with {len(self.events)} spans is stored in {filename}')
+
+
+_tracer = Tracer()
+
+
+def set_trace_account(idx: int, name: str = None):
+    _account.set(idx)
+    if _tracer.enabled:
+        _tracer.threads[idx] = name or f'Account {idx}'
+
+
+def clear_trace_account():
+    _account.set(0)
+
+
+@contextmanager
+def span(name: str, cat: str = 'stage', **args):
+    if not _tracer.enabled:
+        yield
+        return
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    except BaseException as e:
+        args['error'] = type(e).__name__
+        raise
+    finally:
+        _tracer.add(name, cat, start_ns, time.perf_counter_ns(), args)
+
+
+def traced(name: str = None, cat: str = 'stage'):
+    def decorator(async_func):
+        span_name = name or async_func.__name__
+
+        @wraps(async_func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name, cat):
+                return await async_func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def _on_request_start(_, ctx, params):
+    ctx.trace_start_ns = time.perf_counter_ns()
+
+
+async def _on_request_end(_, ctx, params):
+    _tracer.add(f'{params.method} {get_upstream(params.url)}', 'http', ctx.trace_start_ns, time.perf_counter_ns(),
+                {'url': str(params.url.with_query(None)), 'status': params.response.status})
+
+
+async def _on_request_exception(_, ctx, params):
+    _tracer.add(f'{params.method} {get_upstream(params.url)}', 'http', ctx.trace_start_ns, time.perf_counter_ns(),
+                {'url': str(params.url.with_query(None)), 'error': type(params.exception).__name__})
+
+
+def _create_trace_config() -> TraceConfig:
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return trace_config
+
+
+_trace_config: Optional[TraceConfig] = None
+
+
+def start_tracing(filename: Optional[str] = TRACE_FILE):
+    global _trace_config
+    if filename is None:
+        return
+    if _trace_config is None:
+        _trace_config = _create_trace_config()
+        TRACE_CONFIGS.append(_trace_config)
+    _tracer.start()
+
+
+def save_trace(filename: Optional[str] = TRACE_FILE):
+    if filename is None or not _tracer.enabled:
+        return
+    _tracer.save(filename)
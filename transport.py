@@ -0,0 +1,115 @@
+import json
+import time
+from aiohttp import ClientSession, ClientRequest, ClientResponse
+from aiohttp_socks import ProxyConnector
+from multidict import CIMultiDict
+from typing import Optional, TextIO
+from yarl import URL
+
+from config import RECORD_FILE, REPLAY_URL
+from metrics import TRACE_CONFIGS
+
+
+REPLAY_ORIGIN_HEADER = 'X-Replay-Origin'
+SKIP_RESPONSE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection')
+
+
+def _body_text(body) -> str:
+    value = body if isinstance(body, (bytes, bytearray)) else getattr(body, '_value', b'')
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8', errors='replace')
+    return ''
+
+
+class Recorder:
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file: Optional[TextIO] = None
+
+    def write(self, record: dict):
+        if self.file is None:
+            self.file = open(self.filename, 'a', encoding='utf-8')
+        self.file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+_recorder = Recorder(RECORD_FILE) if RECORD_FILE is not None else None
+_replay_url: Optional[str] = REPLAY_URL
+
+
+class RecordingResponse(ClientResponse):
+    _recording = None
+
+    def _record(self, body: Optional[bytes]):
+        if self._recording is None:
+            return
+        started_at, request_body = self._recording
+        self._recording = None
+        _recorder.write({
+            'ts': time.time(),
+            'method': self.method,
+            'url': str(self.url),
+            'body': request_body,
+            'status': self.status,
+            'headers': [[k, v] for k, v in self.headers.items() if k.lower() not in SKIP_RESPONSE_HEADERS],
+            'response': None if body is None else body.decode('utf-8', errors='replace'),
+            'elapsed': time.perf_counter() - started_at,
+        })
+
+    async def read(self) -> bytes:
+        body = await super().read()
+        self._record(body)
+        return body
+
+    def release(self):
+        self._record(self._body)
+        return super().release()
+
+
+class RecordingRequest(ClientRequest):
+
+    async def send(self, conn) -> ClientResponse:
+        started_at = time.perf_counter()
+        request_body = _body_text(self.body)
+        response = await super().send(conn)
+        if isinstance(response, RecordingResponse):
+            response._recording = (started_at, request_body)
+        return response
+
+
+class ReplayRequest(ClientRequest):
+
+    def __init__(self, method: str, url: URL, *args, **kwargs):
+        headers = CIMultiDict(kwargs.pop('headers', None) or {})
+        headers[REPLAY_ORIGIN_HEADER] = str(url.origin())
+        kwargs.pop('proxy', None)
+        kwargs['ssl'] = False
+        super().__init__(method, URL(_replay_url).join(URL(url.raw_path_qs)), *args, headers=headers, **kwargs)
+
+
+def create_session(proxy: Optional[str] = None, **kwargs) -> ClientSession:
+    if _replay_url is not None:
+        proxy = None
+        kwargs['request_class'] = ReplayRequest
+    elif _recorder is not None:
+        kwargs['request_class'] = RecordingRequest
+        kwargs['response_class'] = RecordingResponse
+    connector = ProxyConnector.from_url(proxy) if proxy else None
+    return ClientSession(connector=connector, trace_configs=TRACE_CONFIGS, **kwargs)
+
+
+def set_replay_url(url: Optional[str]):
+    global _replay_url
+    _replay_url = url
+
+
+def stop_recording():
+    if _recorder is not None:
+        _recorder.close()
@@ -1,23 +1,39 @@
+import time
 import random
 import brotli
 import json
 import binascii
 import ua_generator
-import aiohttp
 
-from aiohttp_socks import ProxyConnector
+from email.utils import parsedate_to_datetime
 
 from models import AccountInfo
 from utils import is_empty, handle_aio_response, async_retry
+from transport import create_session
 from config import DISABLE_SSL
 from vars import USER_AGENT, SEC_CH_UA, SEC_CH_UA_PLATFORM
 
 
+CT0_DEFAULT_TTL = 3600 * 24
+
+
 def generate_csrf_token(size=16):
     data = random.getrandbits(size * 8).to_bytes(size, "big")
     return binascii.hexlify(data).decode()
 
 
+def _get_cookie_expire_at(morsel) -> int:
+    now = int(time.time())
+    try:
+        if morsel['max-age']:
+            return now + int(morsel['max-age'])
+        if morsel['expires']:
+            return int(parsedate_to_datetime(morsel['expires']).timestamp())
+    except Exception:
+        pass
+    return now + CT0_DEFAULT_TTL
+
+
 def _get_headers(info: AccountInfo) -> dict:
     if is_empty(info.user_agent):
         # ua = ua_generator.generate(device='desktop', browser='chrome')
@@ -48,6 +64,7 @@ def _get_headers(info: AccountInfo) -> dict:
 class Twitter:
 
     def __init__(self, account_info: AccountInfo):
+        self.account_info = account_info
         self.cookies = {
             'auth_token': account_info.twitter_auth_token,
             'ct0': '',
@@ -58,54 +75,78 @@ class Twitter:
             self.proxy = self.proxy.split('|')[0]
         self.proxy = None if is_empty(self.proxy) else self.proxy
         self.started = False
+        self.ct0_refreshed = False
 
     async def start(self):
         self.started = True
-        ct0 = await self._get_ct0()
+        if self.account_info.twitter_ct0 and self.account_info.twitter_ct0_expire_at > int(time.time()):
+            self._set_ct0(self.account_info.twitter_ct0)
+            return
+        ct0, expire_at = await self._get_ct0()
+        self._save_ct0(ct0, expire_at)
+
+    def _set_ct0(self, ct0):
         self.cookies.update({'ct0': ct0})
         self.headers.update({'x-csrf-token': ct0})
 
-    def get_conn(self):
-        return ProxyConnector.from_url(self.proxy) if self.proxy else None
+    def _save_ct0(self, ct0, expire_at):
+        self._set_ct0(ct0)
+        self.account_info.twitter_ct0 = ct0
+        self.account_info.twitter_ct0_expire_at = expire_at
 
     def set_cookies(self, resp_cookies):
         self.cookies.update({name: value.value for name, value in resp_cookies.items()})
+        ct0 = resp_cookies.get('ct0')
+        if ct0 is not None and ct0.value and ct0.value != self.account_info.twitter_ct0:
+            self._save_ct0(ct0.value, _get_cookie_expire_at(ct0))
+
+    def _ct0_rejected(self, resp) -> bool:
+        # Twitter can end a ct0 before its cookie expires (code 353, csrf cookie and header mismatch, or a bare 403).
+        # The stored one is dropped and a fresh one is fetched once before the request fails
+        if self.ct0_refreshed or resp.status not in (401, 403):
+            return False
+        self.ct0_refreshed = True
+        self.account_info.twitter_ct0 = ''
+        self.account_info.twitter_ct0_expire_at = 0
+        self._set_ct0('')
+        self.started = False
+        return True
 
     @async_retry
     async def request(self, method, url, acceptable_statuses=None, resp_handler=None, with_text=False, **kwargs):
-        if not self.started:
-            await self.start()
-        headers = self.headers.copy()
-        cookies = self.cookies.copy()
-        if 'headers' in kwargs:
-            headers.update(kwargs.pop('headers'))
-        if 'cookies' in kwargs:
-            cookies.update(kwargs.pop('cookies'))
+        extra_headers = kwargs.pop('headers', {})
+        extra_cookies = kwargs.pop('cookies', {})
         if DISABLE_SSL:
             kwargs.update({'ssl': False})
-        async with aiohttp.ClientSession(connector=self.get_conn(), headers=headers, cookies=cookies) as sess:
-            if method.lower() == 'get':
-                async with sess.get(url, **kwargs) as resp:
-                    self.set_cookies(resp.cookies)
-                    return await handle_aio_response(resp, acceptable_statuses, resp_handler, with_text)
-            elif method.lower() == 'post':
-                async with sess.post(url, **kwargs) as resp:
+        while True:
+            if not self.started:
+                await self.start()
+            headers = self.headers.copy()
+            cookies = self.cookies.copy()
+            headers.update(extra_headers)
+            cookies.update(extra_cookies)
+            async with create_session(self.proxy, headers=headers, cookies=cookies) as sess:
+                if method.lower() == 'get':
+                    send = sess.get
+                elif method.lower() == 'post':
+                    send = sess.post
+                else:
+                    raise Exception('Wrong request method')
+                async with send(url, **kwargs) as resp:
                     self.set_cookies(resp.cookies)
+                    if self._ct0_rejected(resp):
+                        continue
                     return await handle_aio_response(resp, acceptable_statuses, resp_handler, with_text)
-            else:
-                raise Exception('Wrong request method')
 
     async def _get_ct0(self):
         try:
             kwargs = {'ssl': False} if DISABLE_SSL else {}
-            async with aiohttp.ClientSession(connector=self.get_conn(),
-                                             headers=self.headers, cookies=self.cookies) as sess:
+            async with create_session(self.proxy, headers=self.headers, cookies=self.cookies) as sess:
                 async with sess.get('https://twitter.com/i/api/1.1/dm/user_updates.json?', **kwargs) as resp:
                     new_csrf = resp.cookies.get("ct0")
                     if new_csrf is None:
                         raise Exception('Empty new csrf')
-                    new_csrf = new_csrf.value
-                    return new_csrf
+                    return new_csrf.value, _get_cookie_expire_at(new_csrf)
         except Exception as e:
             reason = 'Your account has been locked\n' if 'Your account has been locked' in str(e) else ''
             raise Exception(f'Failed to ct0 for twitter: {reason}{str(e)}')
@@ -128,7 +169,7 @@ class Twitter:
         except Exception as e:
             raise Exception(f'Get my username error: {str(e)}')
 
-    async def get_followers_count(self, username):
+    async def _get_user_by_screen_name(self, username, resp_handler):
         url = 'https://twitter.com/i/api/graphql/G3KGOASz96M-Qu0nwmGXNg/UserByScreenName'
         params = {
             'variables': to_json({"screen_name": username, "withSafetyModeUserFields": True}),
@@ -146,14 +187,29 @@ class Twitter:
             }),
             'fieldToggles': to_json({"withAuxiliaryUserLabels": False})
         }
+        return await self.request("GET", url, params=params, resp_handler=resp_handler)
+
+    async def get_followers_count(self, username):
         try:
-            return await self.request(
-                "GET", url, params=params,
-                resp_handler=lambda r: r['data']['user']['result']['legacy']['followers_count']
+            return await self._get_user_by_screen_name(
+                username, lambda r: r['data']['user']['result']['legacy']['followers_count']
             )
         except Exception as e:
             raise Exception(f'Get followers count error: {str(e)}')
 
+    async def get_unavailable_reason(self, username):
+        # Suspended accounts can still sign in and read their settings, but their profile is unavailable
+        def _handler(r):
+            result = r['data']['user']['result']
+            if result.get('__typename') == 'UserUnavailable':
+                return result.get('reason') or 'Unavailable'
+            return None
+
+        try:
+            return await self._get_user_by_screen_name(username, _handler)
+        except Exception as e:
+            raise Exception(f'Get user status error: {str(e)}')
+
     async def get_user_id(self, username):
         url = 'https://twitter.com/i/api/graphql/9zwVLJ48lmVUk8u_Gh9DmA/ProfileSpotlightsQuery'
         if username[0] == '@':
@@ -1,13 +1,15 @@
 import random
 import asyncio
-import aiofiles
+from contextlib import contextmanager
+from contextvars import ContextVar
 from retry import retry
 from web3 import AsyncWeb3
-from typing import cast
+from typing import Optional, Tuple, cast
 from loguru import logger
-from datetime import datetime
 from async_web3 import AsyncHTTPProviderWithProxy
-from config import RPC, MAX_TRIES
+from metrics import RETRIES, get_stage
+from logsink import get_log_sink
+from config import RPC, MAX_TRIES, STAGE_TIMEOUTS
 from aiohttp import ClientResponse
 
 
@@ -23,6 +25,79 @@ async def wait_a_bit(x=1):
     await asyncio.sleep(random.uniform(0.5, 1) * x)
 
 
+class DeadlineExceeded(Exception):
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f'{stage.capitalize()} deadline of {timeout}s exceeded')
+        self.stage = stage
+        self.timeout = timeout
+
+
+class Deadline:
+    # Cancels the task when time is up, like asyncio.timeout on 3.11+, and can be paused for waits with their own budget
+
+    def __init__(self, timeout: float):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.remaining = timeout
+        self.timed_out = False
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.resume()
+
+    def expire(self):
+        self.timed_out = True
+        self.task.cancel()
+
+    def pause(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+            self.remaining = max(0.0, self.expires_at - self.loop.time())
+
+    def resume(self):
+        if self.handle is None and not self.timed_out:
+            self.expires_at = self.loop.time() + self.remaining
+            self.handle = self.loop.call_at(self.expires_at, self.expire)
+
+
+_deadlines: ContextVar[Tuple[Deadline, ...]] = ContextVar('deadlines', default=())
+
+
+async def run_with_deadline(stage: str, coro, timeout: float = None):
+    # The awaited work stops together with nested retries and gas waits while the stage and trace context vars
+    # stay in place
+    if timeout is None:
+        timeout = STAGE_TIMEOUTS.get(stage)
+    if timeout is None:
+        return await coro
+    deadline = Deadline(timeout)
+    token = _deadlines.set(_deadlines.get() + (deadline,))
+    try:
+        return await coro
+    except asyncio.CancelledError:
+        if not deadline.timed_out:
+            raise
+        raise DeadlineExceeded(stage, timeout)
+    finally:
+        deadline.pause()
+        _deadlines.reset(token)
+        if deadline.timed_out and hasattr(deadline.task, 'uncancel'):
+            deadline.task.uncancel()
+
+
+@contextmanager
+def deadlines_paused():
+    # Time spent inside does not count against the enclosing stage and account deadlines
+    deadlines = _deadlines.get()
+    for deadline in deadlines:
+        deadline.pause()
+    try:
+        yield
+    finally:
+        for deadline in deadlines:
+            deadline.resume()
+
+
 @retry(tries=MAX_TRIES, delay=1.5, max_delay=10, backoff=2, jitter=(0, 1))
 def get_w3(proxy: str = None, rpc: str = None):
     if proxy and '|' in proxy:
@@ -35,6 +110,23 @@ def to_bytes(hex_str):
     return AsyncWeb3.to_bytes(hexstr=hex_str)
 
 
+async def rpc_batch(w3: AsyncWeb3, calls):
+    responses = await cast(AsyncHTTPProviderWithProxy, w3.manager.provider).make_batch_request(calls)
+    results = []
+    for (method, _), resp in zip(calls, responses):
+        if 'error' in resp:
+            raise Exception(f'{method} failed: {resp["error"]}')
+        results.append(resp['result'])
+    return results
+
+
+async def contract_calls_batch(w3: AsyncWeb3, contract_calls):
+    results = await rpc_batch(w3, [
+        ('eth_call', [{'to': c.address, 'data': '0x' + c.data.hex()}, 'latest']) for c in contract_calls
+    ])
+    return [c.codec.decode(to_bytes(result)) for c, result in zip(contract_calls, results)]
+
+
 async def close_w3(w3: AsyncWeb3):
     if isinstance(w3.manager.provider, AsyncHTTPProviderWithProxy):
         await cast(AsyncHTTPProviderWithProxy, w3.manager.provider).close()
@@ -80,6 +172,7 @@ def async_retry(async_func):
                 tries -= 1
                 if tries <= 0:
                     raise
+                RETRIES.inc(func=async_func.__name__, stage=get_stage())
                 await asyncio.sleep(delay)
 
                 delay *= 2
@@ -97,6 +190,4 @@ async def log_long_exc(idx, msg, e, warning=False):
     log = logger.warning if warning else logger.error
     log(f'{idx}) {msg}: {e_msg_lines[0]}')
     if len(e_msg_lines) > 1:
-        async with aiofiles.open('logs/errors.txt', 'a', encoding='utf-8') as file:
-            await file.write(f'{str(datetime.now())} | {idx}) Process account error: {e_msg}')
-            await file.flush()
+        get_log_sink().write_error(idx, msg, e_msg)
@@ -29,10 +29,14 @@ INSIGHTS_CONTRACT_ABI = json.load(open('abi/insights.json'))
 CLAIM_HUMAN_PROOF_ADDRESS = '0x9164B7D3ab0B5E26CFF7416f911D461c505F20f6'
 CLAIM_HUMAN_PROOF_ABI = json.load(open('abi/claim_human_proof.json'))
 
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+MULTICALL3_ABI = json.load(open('abi/multicall3.json'))
+
 SCAN = 'https://opbnb.bscscan.com'
 SCAN_ETH = 'https://etherscan.io'
 
 LOG_RESULT_TOPIC = '0x00c995826b58cdd58dce644ee35d6a6db72c38615f9a3ed6184af4b3d7379540'
+LOG_CLAIM_MYTHICAL_TOPIC = '0x1a9d2e9ca790d9268668e91349319dabf88e7d94f94aa2105bc5b10289d43b6e'
 LOG_DATA_NAME_AND_COLOR = [('Uncommon', 'green'), ('Rare', 'cyan'),
                            ('Legendary', 'light_magenta'), ('Mythical', 'light_yellow')]
 
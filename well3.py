@@ -1,12 +1,12 @@
 import time
-import aiohttp
 
 from typing import Union
-from aiohttp_socks import ProxyConnector
 
 from models import AccountInfo
 from twitter import Twitter
 from utils import is_empty, handle_aio_response, async_retry
+from transport import create_session
+from tracing import traced
 from vars import SITE_API_KEY, USER_AGENT, SEC_CH_UA, SEC_CH_UA_PLATFORM
 from config import DISABLE_SSL
 
@@ -61,13 +61,10 @@ class Well3:
             self.proxy = self.proxy.split('|')[0]
         self.proxy = None if is_empty(self.proxy) else self.proxy
 
-    def get_conn(self):
-        return ProxyConnector.from_url(self.proxy) if self.proxy else None
-
     async def _request(self, method, url, headers,
                        acceptable_statuses=None, resp_handler=None, with_text=False, **kwargs):
         cookies = None if is_empty(self.account.cf_clearance) else {'cf_clearance': self.account.cf_clearance}
-        async with aiohttp.ClientSession(connector=self.get_conn(), headers=headers) as sess:
+        async with create_session(self.proxy, headers=headers) as sess:
             if method.lower() == 'get':
                 async with sess.get(url, **kwargs) as resp:
                     return await handle_aio_response(resp, acceptable_statuses, resp_handler, with_text)
@@ -86,6 +83,7 @@ class Well3:
             kwargs.update({'ssl': False})
         return await self._request(method, url, headers, acceptable_statuses, resp_handler, with_text, **kwargs)
 
+    @traced('sign_in')
     @async_retry
     async def sign_in_or_start_register_if_needed(self):
         if is_empty(self.account.well3_auth_token):
@@ -103,6 +101,7 @@ class Well3:
 
         return profile['referralInfo']['myReferrer']['userId'] is None
 
+    @traced('google_sign_in')
     async def sign_in(self):
         try:
 
@@ -193,6 +192,7 @@ class Well3:
         oauth_verifier = oauth_verifier.split('">')[0]
         return state, oauth_verifier
 
+    @traced()
     async def refresh_token(self):
         try:
             data = {